@@ -0,0 +1,138 @@
+"""Fill an AcroForm template once per record from a CSV or JSONL file.
+
+    python batch_fill.py template.pdf records.csv --output-dir filled/
+
+Every record is written to its own PDF. Text fields get the value as-is and
+checkboxes are checked for any truthy value, the same way clicking a checkbox
+in the editor sets its export value. Records are streamed and only a bounded
+number of them are in flight at a time, so memory stays flat regardless of
+the input size.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import fitz
+
+from pdf_engine import PDFEngine
+
+
+# Per-worker state, set up once by init_worker
+_template_bytes = None
+_template_index = None
+
+
+def init_worker(template_path):
+    global _template_bytes, _template_index
+    with open(template_path, "rb") as f:
+        _template_bytes = f.read()
+    _template_index = PDFEngine(fitz.open("pdf", _template_bytes)).field_index
+    _template_index.list_fields()
+
+
+def fill_record(output_path, values):
+    engine = PDFEngine(fitz.open("pdf", _template_bytes), history_limit=0)
+    engine.field_index = _template_index.copy_for(engine.document)
+    known = {name: value for name, value in values.items() if engine.field_index.get(name) is not None}
+    engine.fill_fields(known)
+    engine.save(output_path)
+    engine.close()
+    return len(known)
+
+
+def read_records(input_path, input_format=None):
+    input_format = input_format or ("jsonl" if input_path.lower().endswith((".jsonl", ".json")) else "csv")
+    with open(input_path, newline="", encoding="utf-8") as f:
+        if input_format == "csv":
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def output_name(record, number, name_field, used):
+    """File name for a record; a name seen before gets a -<n> suffix so outputs are never overwritten."""
+    name = str(record.get(name_field) or "") if name_field else ""
+    name = re.sub(r"[^\w.-]+", "_", name).strip("._")
+    if name_field and not name:
+        print(f"record {number}: no value for '{name_field}', named by its number", file=sys.stderr)
+    name = name or f"record_{number:06d}"
+    # Case-insensitive, as the Windows and macOS file systems are
+    candidate, suffix = name, 1
+    while candidate.casefold() in used:
+        suffix += 1
+        candidate = f"{name}-{suffix}"
+    used.add(candidate.casefold())
+    return f"{candidate}.pdf"
+
+
+def run(template_path, input_path, output_dir, workers=None, name_field=None,
+        input_format=None, max_pending=None, report_every=500, out=sys.stdout):
+    if report_every <= 0:
+        raise ValueError("report_every must be positive")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    done = failed = 0
+    pending = {}
+    used_names = set()
+    started = time.perf_counter()
+
+    def collect(futures):
+        nonlocal done, failed
+        for future in futures:
+            number = pending.pop(future)
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"record {number}: {e}", file=sys.stderr)
+            if (done + failed) % report_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{done + failed} records, {done / elapsed:.1f} docs/sec", file=out)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(template_path,)) as pool:
+        for number, record in enumerate(read_records(input_path, input_format), start=1):
+            if len(pending) >= max_pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            output_path = os.path.join(output_dir, output_name(record, number, name_field, used_names))
+            pending[pool.submit(fill_record, output_path, dict(record))] = number
+        finished, _ = wait(pending)
+        collect(finished)
+
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed else 0.0
+    print(f"Filled {done} documents ({failed} failed) in {elapsed:.2f}s: {rate:.1f} docs/sec", file=out)
+    return done, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill a PDF form template for every record in a CSV or JSONL file.")
+    parser.add_argument("template", help="AcroForm PDF to fill")
+    parser.add_argument("records", help="CSV file with a header row, or JSONL with one object per line")
+    parser.add_argument("-o", "--output-dir", default="filled", help="directory for the filled PDFs")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--name-field", help="record key used as the output file name instead of the record number (it is still filled)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="input format (default: from the file extension)")
+    parser.add_argument("--report-every", type=int, default=500, help="print throughput every N records")
+    args = parser.parse_args(argv)
+    if args.report_every <= 0:
+        parser.error("--report-every must be positive")
+
+    _, failed = run(args.template, args.records, args.output_dir, workers=args.workers,
+                    name_field=args.name_field, input_format=args.format, report_every=args.report_every)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Compare the editor's page display path with the PIL path it replaced.
+
+    python bench_display.py document.pdf --pages 20
+
+The old path converted the pixmap with Image.frombytes, pasted it into a
+full-canvas grey Image and built an ImageTk.PhotoImage from that. The current
+path hands PPM bytes from the pixmap straight to a Tk photo image and centres
+the page by canvas placement. Rasterization is timed separately because it is
+the same for both. A display is required, since both paths end in Tk.
+"""
+import argparse
+import sys
+import time
+import tkinter as tk
+
+import fitz
+from PIL import Image, ImageTk
+
+
+def pil_path(pix, canvas_size):
+    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    background = Image.new("RGB", canvas_size, "grey")
+    background.paste(image, ((canvas_size[0] - image.width) // 2, (canvas_size[1] - image.height) // 2))
+    return ImageTk.PhotoImage(background)
+
+
+def ppm_path(pix, canvas_size):
+    return tk.PhotoImage(data=pix.tobytes("ppm"), format="ppm")
+
+
+def time_path(convert, pixmaps, canvas_size, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for pix in pixmaps:
+            convert(pix, canvas_size)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(pixmaps)
+
+
+def run(path, pages=10, width=1200, height=800, repeat=3, out=sys.stdout):
+    root = tk.Tk()
+    root.withdraw()
+    document = fitz.open(path)
+    page_indices = range(min(pages, len(document)))
+
+    started = time.perf_counter()
+    pixmaps = []
+    for page_index in page_indices:
+        page = document[page_index]
+        scale = min(width / page.mediabox.width, height / page.mediabox.height)
+        pixmaps.append(page.get_pixmap(matrix=fitz.Matrix(scale, scale)))
+    raster = (time.perf_counter() - started) / len(pixmaps)
+
+    results = {
+        "rasterize": raster,
+        "pil": time_path(pil_path, pixmaps, (width, height), repeat),
+        "ppm": time_path(ppm_path, pixmaps, (width, height), repeat),
+    }
+    print(f"{len(pixmaps)} pages at {width}x{height}, best of {repeat}", file=out)
+    for name, seconds in results.items():
+        print(f"  {name:<10} {seconds * 1000:8.2f} ms/page", file=out)
+    print(f"  speedup    {results['pil'] / results['ppm']:8.2f}x (conversion only)", file=out)
+    document.close()
+    root.destroy()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the page display path against the old PIL compositing path.")
+    parser.add_argument("pdf", help="document to render")
+    parser.add_argument("--pages", type=int, default=10, help="number of pages to render")
+    parser.add_argument("--width", type=int, default=1200, help="canvas width in pixels")
+    parser.add_argument("--height", type=int, default=800, help="canvas height in pixels")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path; the best one is reported")
+    args = parser.parse_args(argv)
+    run(args.pdf, pages=args.pages, width=args.width, height=args.height, repeat=args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""Headless benchmarks for the editing engine on generated and real documents.
+
+    python benchmark.py --output results.json
+    python benchmark.py --output new.json --compare results.json
+
+Synthetic PDFs are generated with PyMuPDF: text pages with a given word
+density, pages of AcroForm fields, and image-heavy "scanned" pages. Together
+with template.pdf they are put through the editor's hot paths: rasterization,
+sentence extraction, click hit-testing, redaction-based text replacement,
+find-and-replace, form filling, stroke flattening, search indexing and saving.
+Every timing is the best of --repeat runs on a fresh copy of the document.
+Results are written as JSON, and --compare reports the ratio to an earlier
+run, exiting with 1 when something got slower than --threshold. No display
+is needed; the Tk display path has its own script, bench_display.py.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz
+
+from pdf_engine import AddInk, PDFEngine, ReplaceText, SpatialIndex, StrokePoints
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Common enough that find-and-replace and search have hits on most pages
+KEYWORDS = ["invoice", "total", "customer", "payment", "account"]
+
+
+def random_words(rng, count, vocabulary):
+    words = []
+    while len(words) < count:
+        sentence = [rng.choice(KEYWORDS if rng.random() < 0.02 else vocabulary) for _ in range(rng.randint(6, 16))]
+        sentence[0] = sentence[0].capitalize()
+        sentence[-1] += "."
+        words.extend(sentence)
+    return " ".join(words[:count])
+
+
+def make_text_pdf(pages=100, words_per_page=400, seed=1):
+    """Pages of sentences in Helvetica, smaller for denser pages, as bytes."""
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))) for _ in range(3000)]
+    font_size = 10 if words_per_page <= 450 else 8 if words_per_page <= 800 else 6
+    document = fitz.open()
+    for _ in range(pages):
+        page = document.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50),
+                            random_words(rng, words_per_page, vocabulary), fontsize=font_size)
+    return document.tobytes()
+
+
+def make_form_pdf(fields=200, per_page=40):
+    """Text fields and checkboxes in a grid, per_page of them on each page, as bytes."""
+    document = fitz.open()
+    page = None
+    for number in range(fields):
+        slot = number % per_page
+        if slot == 0:
+            page = document.new_page()
+        x = 50 + (slot % 2) * 260
+        y = 50 + (slot // 2) * 36
+        widget = fitz.Widget()
+        widget.field_name = f"field_{number:04d}"
+        if number % 5 == 4:
+            widget.field_type = fitz.PDF_WIDGET_TYPE_CHECKBOX
+            widget.rect = fitz.Rect(x, y, x + 14, y + 14)
+        else:
+            widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+            widget.rect = fitz.Rect(x, y, x + 220, y + 20)
+        page.add_widget(widget)
+    return document.tobytes()
+
+
+def make_image_pdf(pages=20, image_size=1200, seed=1):
+    """Pages covered by an incompressible RGB image plus a caption, like a scan, as bytes."""
+    rng = random.Random(seed)
+    document = fitz.open()
+    for number in range(pages):
+        samples = rng.getrandbits(image_size * image_size * 24).to_bytes(image_size * image_size * 3, "little")
+        pixmap = fitz.Pixmap(fitz.csRGB, image_size, image_size, samples, False)
+        page = document.new_page()
+        page.insert_image(page.rect, pixmap=pixmap)
+        page.insert_text((72, 60), f"Scanned page {number + 1}. Reference number {rng.randint(10000, 99999)}.", fontsize=12)
+    return document.tobytes()
+
+
+def open_engine(data):
+    return PDFEngine(fitz.open("pdf", data))
+
+
+def measure(run, repeat, setup=None):
+    """Best and mean wall time of run(state) over repeat calls; setup() is not timed."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        result = run(state)
+        times.append(time.perf_counter() - started)
+    return min(times), sum(times) / len(times), result
+
+
+def bench_rasterize(data, scale=1.5, max_pages=20):
+    def run(engine):
+        count = min(len(engine), max_pages)
+        for page_index in range(count):
+            engine.render_pixmap(page_index, scale).tobytes("ppm")
+        return count
+    return run, lambda: open_engine(data), "page"
+
+
+def bench_extract_sentences(data, max_pages=50):
+    def run(engine):
+        count = min(len(engine), max_pages)
+        for page_index in range(count):
+            engine.sentences(page_index)
+        return count
+    return run, lambda: open_engine(data), "page"
+
+
+def bench_hit_test(data, queries=20000):
+    # The editor hit-tests every click and mouse move against the current page's items
+    engine = open_engine(data)
+    index = SpatialIndex()
+    for sentence in engine.sentences(0):
+        index.insert("text", sentence, sentence["rect"])
+    width, height = engine.page_sizes()[0]
+    rng = random.Random(2)
+    points = [(rng.uniform(0, width), rng.uniform(0, height)) for _ in range(queries)]
+
+    def run(_):
+        for x, y in points:
+            index.query_point(x, y)
+        return queries
+    return run, None, "query"
+
+
+def bench_replace_text(data, max_pages=20):
+    def setup():
+        engine = open_engine(data)
+        operations = []
+        for page_index in range(min(len(engine), max_pages)):
+            sentences = engine.sentences(page_index)
+            if sentences:
+                operations.append(ReplaceText(page_index, tuple(sentences[0]["rect"]), "Replacement sentence.", font_size=10))
+        return engine, operations
+
+    def run(state):
+        engine, operations = state
+        engine.apply(*operations)
+        return len(operations)
+    return run, setup, "replacement"
+
+
+def bench_replace_all(data, query="total", replacement="TOTAL"):
+    def run(engine):
+        return sum(engine.replace_all(query, replacement)[0].values())
+    return run, lambda: open_engine(data), "match"
+
+
+def bench_fill_form(data):
+    def setup():
+        engine = open_engine(data)
+        values = {}
+        for field in engine.list_fields():
+            values[field["field_name"]] = True if field["field_type"] == "checkbox" else f"Value for {field['field_name']}"
+        return engine, values
+
+    def run(state):
+        engine, values = state
+        engine.fill_fields(values)
+        return len(values)
+    return run, setup, "field"
+
+
+def bench_flatten_strokes(data, strokes=50, points=500, tolerance=0.5):
+    rng = random.Random(3)
+    paths = []
+    for _ in range(strokes):
+        stroke = StrokePoints()
+        x, y = rng.uniform(100, 400), rng.uniform(100, 600)
+        for _ in range(points):
+            x += rng.uniform(-2, 2)
+            y += rng.uniform(-2, 2)
+            stroke.append(x, y)
+        paths.append(list(stroke.simplified(tolerance)))
+
+    def run(engine):
+        engine.apply(*[AddInk(0, path, color=(0, 0, 255), width=2, smooth=True) for path in paths])
+        return strokes
+    return run, lambda: open_engine(data), "stroke"
+
+
+def bench_search_index(data, query="customer payment"):
+    def run(engine):
+        engine.update_search_index()
+        engine.search(query)
+        return len(engine)
+    return run, lambda: open_engine(data), "page"
+
+
+def bench_save(data, directory, incremental=False):
+    path = os.path.join(directory, "save.pdf")
+
+    def setup():
+        with open(path, "wb") as f:
+            f.write(data)
+        engine = PDFEngine.open(path)
+        sentences = engine.sentences(0)
+        if sentences:
+            engine.apply(ReplaceText(0, tuple(sentences[0]["rect"]), "Edited.", font_size=10))
+        return engine
+
+    def run(engine):
+        engine.save(path if incremental else path + ".full.pdf")
+        engine.close()
+        return 1
+    return run, setup, "save"
+
+
+def build_cases(args):
+    cases = {
+        "text": make_text_pdf(args.pages, args.words),
+        "form": make_form_pdf(args.fields),
+        "images": make_image_pdf(args.image_pages, args.image_size),
+    }
+    template = os.path.join(HERE, "template.pdf")
+    if os.path.exists(template):
+        with open(template, "rb") as f:
+            cases["template"] = f.read()
+    return cases
+
+
+def benchmarks_for(case, data, directory):
+    common = [
+        ("rasterize", bench_rasterize(data)),
+        ("save_full", bench_save(data, directory)),
+        ("save_incremental", bench_save(data, directory, incremental=True)),
+    ]
+    specific = {
+        "text": [
+            ("extract_sentences", bench_extract_sentences(data)),
+            ("hit_test", bench_hit_test(data)),
+            ("replace_text", bench_replace_text(data)),
+            ("replace_all", bench_replace_all(data)),
+            ("flatten_strokes", bench_flatten_strokes(data)),
+            ("search_index", bench_search_index(data)),
+        ],
+        "form": [("fill_form", bench_fill_form(data))],
+        "images": [
+            ("extract_sentences", bench_extract_sentences(data)),
+            ("replace_text", bench_replace_text(data)),
+        ],
+        "template": [
+            ("extract_sentences", bench_extract_sentences(data)),
+            ("hit_test", bench_hit_test(data)),
+            ("replace_text", bench_replace_text(data)),
+            ("fill_form", bench_fill_form(data)),
+            ("flatten_strokes", bench_flatten_strokes(data)),
+        ],
+    }
+    return common[:1] + specific.get(case, []) + common[1:]
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run(args, out=sys.stdout):
+    cases = build_cases(args)
+    selected = set(args.only) if args.only else None
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pdf-bench-") as directory:
+        for case, data in cases.items():
+            for name, (bench, setup, unit) in benchmarks_for(case, data, directory):
+                if selected and name not in selected and case not in selected:
+                    continue
+                best, mean, items = measure(bench, args.repeat, setup)
+                items = items or 0
+                result = {
+                    "case": case,
+                    "benchmark": name,
+                    "best_s": best,
+                    "mean_s": mean,
+                    "items": items,
+                    "unit": unit,
+                    "per_item_ms": best / items * 1000 if items else None,
+                    "document_bytes": len(data),
+                }
+                results.append(result)
+                per_item = f"{result['per_item_ms']:10.3f} ms/{unit}" if items else ""
+                print(f"{case:<9} {name:<18} {best * 1000:10.2f} ms  {items:>7} x {unit:<12} {per_item}", file=out)
+    return {
+        "environment": environment(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "only")},
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold, out=sys.stdout):
+    """Print best-time ratios against a baseline run; returns the regressions."""
+    previous = {(r["case"], r["benchmark"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline['environment'].get('commit') or 'baseline'}:", file=out)
+    for result in current["results"]:
+        old = previous.get((result["case"], result["benchmark"]))
+        if old is None or not old["best_s"]:
+            continue
+        ratio = result["best_s"] / old["best_s"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['case']:<9} {result['benchmark']:<18} {old['best_s'] * 1000:10.2f} -> "
+              f"{result['best_s'] * 1000:10.2f} ms  x{ratio:5.2f}{flag}", file=out)
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PDF editing engine on generated documents and template.pdf.")
+    parser.add_argument("-o", "--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best one is reported")
+    parser.add_argument("--pages", type=int, default=50, help="pages in the generated text document")
+    parser.add_argument("--words", type=int, default=400, help="words per page in the generated text document")
+    parser.add_argument("--fields", type=int, default=200, help="form fields in the generated form")
+    parser.add_argument("--image-pages", type=int, default=10, help="pages in the generated image-heavy document")
+    parser.add_argument("--image-size", type=int, default=1200, help="width and height in pixels of each page image")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="only run these benchmarks or cases")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Replace every occurrence of a phrase throughout a PDF.
+
+    python find_replace.py input.pdf output.pdf --find "Acme Ltd" --replace "Acme GmbH"
+
+Matches are found with page.search_for and re-typeset in the font size,
+family and colour of the text they replace. Only the search is split across
+worker processes, which each read the input file. The replacements are
+applied to the one output document in this process as chunks of pages come
+back, with a single redaction pass per page. Pages edited in separate
+documents could not be merged back without losing forms, links and other
+document-level objects, so applying them is not parallel.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fitz
+
+from pdf_engine import PDFEngine, find_text
+
+
+# Per-worker state, set up once by init_worker
+_document = None
+
+
+def init_worker(input_path):
+    global _document
+    _document = fitz.open(input_path)
+
+
+def find_in_pages(query, page_indices):
+    matches = []
+    for page_index in page_indices:
+        for match in find_text(_document[page_index], query):
+            match["rect"] = tuple(match["rect"])
+            matches.append(match)
+    return matches
+
+
+def page_chunks(page_count, chunk_size):
+    return [range(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+
+
+def run(input_path, output_path, query, replacement, workers=None, chunk_size=50, out=sys.stdout):
+    workers = workers or os.cpu_count() or 1
+    engine = PDFEngine.open(input_path, history_limit=0)
+    counts = {}
+    failed = []
+    started = time.perf_counter()
+
+    chunks = page_chunks(len(engine), chunk_size)
+    if workers == 1 or len(chunks) == 1:
+        counts, failed = engine.replace_all(query, replacement)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(input_path,)) as pool:
+            futures = [pool.submit(find_in_pages, query, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                chunk_counts, chunk_failed = engine.replace_all(query, replacement, matches=future.result())
+                counts.update(chunk_counts)
+                failed.extend(chunk_failed)
+
+    if counts:
+        engine.save(output_path)
+    engine.close()
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"Replaced {total} matches on {len(counts)} pages in {elapsed:.2f}s", file=out)
+    for match in failed:
+        print(f"  could not replace the match on page {match['page'] + 1} at {tuple(round(v, 1) for v in match['rect'])}", file=out)
+    return counts, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and replace a phrase throughout a PDF.")
+    parser.add_argument("input", help="PDF to search")
+    parser.add_argument("output", help="where to write the edited PDF")
+    parser.add_argument("-f", "--find", required=True, help="text to look for (case-insensitive)")
+    parser.add_argument("-r", "--replace", default="", help="replacement text (default: remove the matches)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes searching the input (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=50, help="pages searched per worker task")
+    parser.add_argument("--per-page", action="store_true", help="also print the number of replacements on each page")
+    args = parser.parse_args(argv)
+
+    counts, failed = run(args.input, args.output, args.find, args.replace, workers=args.workers, chunk_size=args.chunk_size)
+    if args.per_page:
+        for page_index in sorted(counts):
+            print(f"  page {page_index + 1}: {counts[page_index]}")
+    return 0 if counts and not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
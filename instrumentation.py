@@ -0,0 +1,177 @@
+"""Timing spans and counters for the editor's hot paths.
+
+Everything reports to the module-level PROFILER. While it is disabled, span()
+hands back a shared no-op context manager and count() returns straight away,
+so instrumented code costs one attribute check. Set PDF_EDITOR_TRACE=<path>
+to profile any script that uses the engine and write a Chrome trace on exit.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    __slots__ = ("profiler", "name", "args", "start")
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.args["error"] = repr(exc)
+        self.profiler.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Profiler:
+    """Aggregated timings and counters plus a bounded log of individual events."""
+
+    def __init__(self, max_events=100000):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter_ns()
+        self.events = deque(maxlen=max_events)
+        self.timings = {}  # name -> [count, total ns, max ns, last ns]
+        self.counters = {}
+        self.errors = deque(maxlen=1000)
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self.lock:
+            self.origin = time.perf_counter_ns()
+            self.events.clear()
+            self.timings.clear()
+            self.counters.clear()
+            self.errors.clear()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def timed(self, name):
+        """Decorator form of span()."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with Span(self, name, {}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+            self.events.append(("C", name, time.perf_counter_ns(), None, total, threading.get_ident()))
+
+    def error(self, message):
+        # Errors are kept even while disabled, they are rare and the overlay shows the last one
+        now = time.perf_counter_ns()
+        with self.lock:
+            self.errors.append((now, message))
+            if self.enabled:
+                self.events.append(("i", "error", now, None, message, threading.get_ident()))
+
+    def record(self, name, start, end, args):
+        duration = end - start
+        with self.lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = [0, 0, 0, 0]
+            timing[0] += 1
+            timing[1] += duration
+            timing[2] = max(timing[2], duration)
+            timing[3] = duration
+            self.events.append(("X", name, start, end, args, threading.get_ident()))
+
+    def last_ms(self, name):
+        timing = self.timings.get(name)
+        return timing[3] / 1e6 if timing else None
+
+    def summary(self):
+        with self.lock:
+            timings = {
+                name: {
+                    "count": count,
+                    "total_ms": total / 1e6,
+                    "mean_ms": total / count / 1e6,
+                    "max_ms": longest / 1e6,
+                    "last_ms": last / 1e6,
+                }
+                for name, (count, total, longest, last) in sorted(self.timings.items())
+            }
+            return {
+                "timings": timings,
+                "counters": dict(self.counters),
+                "errors": [{"t_ms": (t - self.origin) / 1e6, "message": m} for t, m in self.errors],
+            }
+
+    def export_json(self, path):
+        """Write the summary and every recorded span as plain JSON."""
+        data = self.summary()
+        with self.lock:
+            data["spans"] = [
+                {"name": name, "start_ms": (start - self.origin) / 1e6, "duration_ms": (end - start) / 1e6, "args": args}
+                for kind, name, start, end, args, _ in self.events if kind == "X"
+            ]
+        self._write(path, data)
+
+    def export_chrome_trace(self, path):
+        """Write the events in the Trace Event Format read by chrome://tracing and Perfetto."""
+        pid = os.getpid()
+        events = []
+        with self.lock:
+            for kind, name, start, end, value, tid in self.events:
+                event = {"name": name, "ph": kind, "ts": (start - self.origin) / 1000, "pid": pid, "tid": tid}
+                if kind == "X":
+                    event["dur"] = (end - start) / 1000
+                    event["args"] = value
+                elif kind == "C":
+                    event["args"] = {name: value}
+                else:
+                    event["s"] = "p"
+                    event["args"] = {"message": value}
+                events.append(event)
+        data = {"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.summary()}
+        self._write(path, data)
+
+    @staticmethod
+    def _write(path, data):
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, default=str)
+        os.replace(temp_path, path)
+
+
+PROFILER = Profiler()
+
+if os.environ.get("PDF_EDITOR_TRACE"):
+    PROFILER.enable()
+    atexit.register(PROFILER.export_chrome_trace, os.environ["PDF_EDITOR_TRACE"])
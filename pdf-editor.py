@@ -2,10 +2,426 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, colorchooser, ttk
 from PIL import Image, ImageTk
 import fitz
+import bisect
+import functools
+import gzip
+import hashlib
+import json
 import os
+import shutil
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from instrumentation import PROFILER
+from pdf_engine import (
+    AddInk,
+    DeleteField,
+    DeleteText,
+    FillField,
+    InsertText,
+    MoveField,
+    MoveText,
+    EngineError,
+    PDFEngine,
+    ReplaceText,
+    SpatialIndex,
+    StrokePoints,
+    page_word_entries,
+    resident_memory,
+    thread_document,
+)
+
+
+ZOOM_LEVELS = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0)
+
+
+def render_page_ppm(page, scale_factor, clip=None):
+    # Tk decodes PPM itself, so the pixmap reaches the photo image with a single copy
+    mat = fitz.Matrix(scale_factor, scale_factor)
+    with PROFILER.span("get_pixmap", page=page.number, scale=round(scale_factor, 3), tile=clip is not None):
+        try:
+            pix = page.get_pixmap(matrix=mat, clip=clip, annot=True)
+        except TypeError:
+            pix = page.get_pixmap(matrix=mat, clip=clip)
+        return pix.tobytes("ppm")
+
+
+def render_thumbnail_png(page, width):
+    with PROFILER.span("render_thumbnail", page=page.number):
+        pix = page.get_pixmap(matrix=fitz.Matrix(width / page.rect.width, width / page.rect.width))
+        return pix.tobytes("png")
+
+
+def holds_engine_lock(method):
+    # For PDFEditor methods that use pages directly; the autosave worker holds the lock while
+    # it serializes the document, and is the only other user of it
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.engine is None:
+            return method(self, *args, **kwargs)
+        with self.engine.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def show_error(title, message):
+    # Errors also go to the profiler, so they show up in the stats overlay and exported traces
+    PROFILER.error(message)
+    messagebox.showerror(title, message)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_thumbnail_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "pdf-editor", "thumbnails")
+
+
+def default_search_index_dir():
+    return os.path.join(os.path.dirname(default_thumbnail_dir()), "search")
+
+
+def tile_clip(page, scale_factor, tile, tile_size):
+    # PDF rectangle covered by a tile of the page rasterized at scale_factor
+    tx, ty = tile
+    clip = fitz.Rect(tx * tile_size, ty * tile_size, (tx + 1) * tile_size, (ty + 1) * tile_size) / scale_factor
+    return clip & page.rect
+
+
+class PageImageCache:
+    """LRU cache of rasterized pages and page tiles keyed by (page index, scale, page revision, tile)."""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(page_index, scale_factor, revision, tile=None):
+        return (page_index, round(scale_factor, 4), revision, tile)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            PROFILER.count("page_cache.miss")
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        PROFILER.count("page_cache.hit")
+        return entry[0]
+
+    def put(self, key, value, nbytes):
+        if key in self.entries:
+            self.current_bytes -= self.entries.pop(key)[1]
+        if nbytes > self.max_bytes:
+            return
+        self.entries[key] = (value, nbytes)
+        self.current_bytes += nbytes
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self.entries.popitem(last=False)
+            self.current_bytes -= evicted_bytes
+
+    def invalidate_page(self, page_index):
+        for key in [k for k in self.entries if k[0] == page_index]:
+            self.current_bytes -= self.entries.pop(key)[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+
+class PagePrefetcher:
+    """Rasterizes neighbouring pages on worker threads.
+
+    Each worker opens its own copy of the file, so only pages without unsaved
+    edits can be prefetched; edited pages are always rendered on the Tk thread.
+    """
+
+    def __init__(self, depth=2, workers=1):
+        self.depth = depth
+        self.executor = None
+        if depth > 0 and workers > 0:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.filepath = None
+        self.memory_map = False
+        self.generation = 0
+        self.pending = {}
+
+    def reset(self, filepath, memory_map=False):
+        self.cancel_all()
+        self.filepath = filepath
+        self.memory_map = memory_map
+        self.generation += 1
+
+    def submit(self, key):
+        if self.executor is None or not self.filepath or key in self.pending:
+            return
+        self.pending[key] = self.executor.submit(self._render, key, self.filepath, self.generation, self.memory_map)
+
+    def cancel_page(self, page_index):
+        for key in [k for k in self.pending if k[0] == page_index]:
+            self.pending.pop(key).cancel()
+
+    def cancel_all(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def take(self, key):
+        # Waits for a page that is already being rendered instead of rendering it twice
+        future = self.pending.pop(key, None)
+        if future is None or future.cancel():
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def pop_finished(self):
+        results = []
+        for key in [k for k, f in self.pending.items() if f.done()]:
+            future = self.pending.pop(key)
+            if not future.cancelled() and future.exception() is None:
+                results.append((key, future.result()))
+        return results
+
+    def shutdown(self):
+        self.cancel_all()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def _render(self, key, filepath, generation, memory_map):
+        page_index, scale_factor = key[:2]
+        with thread_document(filepath, generation, memory_map) as document:
+            return render_page_ppm(document[page_index], scale_factor)
+
+
+class ThumbnailCache:
+    """Page thumbnails as PNG files on disk, produced by a background worker.
+
+    Files live under <directory>/<sha256 of the file>/p<page>-r<revision>.png. Only
+    unedited pages (revision 0) are read from and rendered into the cache; edited
+    pages are rendered from the saved file under its hash when the document is
+    saved, so reopening it only regenerates what is missing.
+    """
+
+    def __init__(self, directory, width=100):
+        self.directory = directory
+        self.width = width
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+        self.filepath = None
+        self.memory_map = False
+        self.hash_future = None
+        self.generation = 0
+        self.pending = {}
+
+    def reset(self, filepath, memory_map=False):
+        self.cancel_all()
+        self.filepath = filepath
+        self.memory_map = memory_map
+        self.generation += 1
+        # Queued first on the single worker, so every later job can wait on it
+        self.hash_future = self.executor.submit(file_digest, filepath)
+
+    def path_for(self, file_hash, page_index, revision):
+        return os.path.join(self.directory, file_hash, f"p{page_index}-r{revision}.png")
+
+    def submit(self, page_index):
+        # Unedited pages: read from disk or render from the file on the worker
+        if not self.filepath or page_index in self.pending:
+            return
+        # The hash future is captured now: a later publish replaces it with a job queued behind this one
+        self.pending[page_index] = self.executor.submit(
+            self._load_or_render, self.hash_future, page_index, self.filepath, self.generation, self.memory_map)
+
+    def publish(self, saved_path, pages, replaces_opened=False):
+        """Seed the cache for a freshly saved file.
+
+        `pages` are the pages that differ from the opened file; the worker renders
+        them from the saved file and copies the thumbnails of all other pages. With
+        replaces_opened=True the saved file is the opened one from now on.
+        """
+        if self.hash_future is None:
+            return
+        future = self.executor.submit(self._publish, self.hash_future, saved_path, set(pages))
+        if replaces_opened:
+            # Jobs run in order on the single worker, so later ones find it done
+            self.hash_future = future
+
+    def cancel_all(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def pop_finished(self):
+        results = []
+        for page_index in [p for p, f in self.pending.items() if f.done()]:
+            future = self.pending.pop(page_index)
+            if not future.cancelled() and future.exception() is None:
+                results.append((page_index, future.result()))
+        return results
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
+
+    @staticmethod
+    def _write_file(path, png):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(png)
+        os.replace(temp_path, path)
+
+    def _load_or_render(self, hash_future, page_index, filepath, generation, memory_map):
+        path = self.path_for(hash_future.result(), page_index, 0)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        with thread_document(filepath, generation, memory_map) as document:
+            png = render_thumbnail_png(document[page_index], self.width)
+        self._write_file(path, png)
+        return png
+
+    def _publish(self, hash_future, saved_path, pages):
+        old_hash = hash_future.result()
+        new_hash = file_digest(saved_path)
+        if new_hash == old_hash:
+            return old_hash
+        old_dir = os.path.join(self.directory, old_hash)
+        for name in os.listdir(old_dir) if os.path.isdir(old_dir) else ():
+            if not (name.startswith("p") and name.endswith("-r0.png")):
+                continue
+            page_index = int(name[1:-len("-r0.png")])
+            if page_index not in pages:
+                new_path = self.path_for(new_hash, page_index, 0)
+                os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                shutil.copyfile(os.path.join(old_dir, name), new_path)
+        if pages:
+            document = fitz.open(saved_path)
+            try:
+                for page_index in sorted(pages):
+                    self._write_file(self.path_for(new_hash, page_index, 0), render_thumbnail_png(document[page_index], self.width))
+            finally:
+                document.close()
+        return new_hash
+
+
+class SearchIndexBuilder:
+    """Extracts the words of unedited pages for the search index on a worker thread.
+
+    Word lists are stored per file in <directory>/<sha256 of the file>.jsonl.gz, one
+    page per line so a large file is parsed without holding the GIL throughout.
+    The cached file is loaded first; pages missing from it are extracted from
+    the file on disk in chunks, and the cache is rewritten once all are in.
+    """
+
+    def __init__(self, directory, chunk_size=25):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+        self.filepath = None
+        self.memory_map = False
+        self.hash_future = None
+        self.generation = 0
+        self.pending = []
+        self.words = {}  # page index -> entries gathered for the cache file
+        self.extracting = False
+
+    def reset(self, filepath, hash_future, page_count, memory_map=False):
+        self.cancel_all()
+        self.filepath = filepath
+        self.memory_map = memory_map
+        self.hash_future = hash_future
+        self.generation += 1
+        self.words = {}
+        self.extracting = False
+        self.pending = [self.executor.submit(self._load, hash_future, page_count)]
+
+    def path_for(self, file_hash):
+        return os.path.join(self.directory, f"{file_hash}.jsonl.gz")
+
+    def publish(self, saved_path, pages):
+        """Store the word lists of every page of a freshly saved file."""
+        self.executor.submit(self._publish, saved_path, dict(pages))
+
+    def cancel_all(self):
+        for future in self.pending:
+            future.cancel()
+        self.pending = []
+
+    def pop_finished(self):
+        # Finished results as {page index: entries}; the cache load also queues the missing pages
+        results = []
+        for future in [f for f in self.pending if f.done()]:
+            self.pending.remove(future)
+            if future.cancelled() or future.exception() is not None:
+                continue
+            pages, missing = future.result()
+            self.extracting = self.extracting or bool(missing)
+            for start in range(0, len(missing), self.chunk_size):
+                chunk = missing[start:start + self.chunk_size]
+                self.pending.append(self.executor.submit(
+                    self._extract, chunk, self.filepath, self.generation, self.memory_map))
+            self.words.update(pages)
+            results.append(pages)
+        if self.extracting and not self.pending:
+            self.extracting = False
+            self.executor.submit(self._write_file, self.path_for(self.hash_future.result()), self.words)
+            self.words = {}
+        return results
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
+
+    @staticmethod
+    def _write_file(path, pages):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            for page_index in sorted(pages):
+                f.write(json.dumps([page_index, pages[page_index]], separators=(",", ":")) + "\n")
+        os.replace(temp_path, path)
+
+    def _load(self, hash_future, page_count):
+        path = self.path_for(hash_future.result())
+        pages = {}
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    page_index, entries = json.loads(line)
+                    pages[page_index] = entries
+        except (OSError, ValueError):
+            pass
+        return pages, [page_index for page_index in range(page_count) if page_index not in pages]
+
+    def _extract(self, page_indices, filepath, generation, memory_map):
+        with thread_document(filepath, generation, memory_map) as document:
+            return {page_index: page_word_entries(document[page_index]) for page_index in page_indices}, []
+
+    def _publish(self, saved_path, pages):
+        self._write_file(self.path_for(file_digest(saved_path)), pages)
+
 
 class PDFEditor:
-    def __init__(self, root):
+    def __init__(self, root, cache_limit_mb=256, prefetch_depth=2, prefetch_workers=1, autosave_interval_s=60,
+                 stroke_tolerance=0.5, smooth_strokes=True, thumbnail_dir=None, thumbnail_width=100,
+                 history_limit_mb=64, search_index_dir=None, large_document_mb=512, memory_limit_mb=None,
+                 profile=False):
         self.root = root
         self.root.title("Interactive PDF Text Editor")
 
@@ -18,9 +434,11 @@ class PDFEditor:
         self.canvas_height = 800
 
         self.filepath = None
+        self.engine = None
         self.pdf_document = None
         self.current_page_index = 0
         self.selected_text = None
+        self.selected_sentences = []  # shift-click multi-selection for bulk deletes
         self.font_size = 12
         self.font_color = (0, 0, 0)
         self.typing_content = False
@@ -30,19 +448,111 @@ class PDFEditor:
         self.crop_x = 0
         self.crop_y = 0
 
+        # Zoom is relative to the fit-to-window scale; pages that overflow the canvas
+        # are rasterized as tiles of the visible area only
+        self.zoom = 1.0
+        self.tile_size = 512
+        self.visible_tiles = {}
+        self.pan_last = None
+
+        # Continuous mode stacks all pages at fit-to-width scale. Only pages near the viewport
+        # are placed on the canvas; the rest exist as offsets computed from their mediaboxes.
+        self.continuous = False
+        self.continuous_scale = 1
+        self.continuous_height = 0
+        self.page_gap = 12
+        self.page_tops = []
+        self.layout_key = None
+        self.scroll_y = 0
+        self.continuous_pages = {}  # page index -> PhotoImage, or placeholder item while queued
+        self.continuous_queue = []
+        self.continuous_render_id = None
+
+        # Sidebar of page thumbnails, generated off the Tk thread and cached on disk
+        self.thumbnails = ThumbnailCache(thumbnail_dir or default_thumbnail_dir(), thumbnail_width)
+        self.thumbnail_png = {}  # page index -> (page revision, PNG bytes)
+        self.saved_revisions = {}  # page index -> page revision when the opened file was last saved
+        self.thumbnail_items = {}  # page index -> (canvas item, PhotoImage) for rows near the view
+        self.thumbnail_tops = []
+        self.stale_thumbnails = set()
+        self.thumbnail_poll_id = None
+        self.thumbnail_refresh_id = None
+
+        # Document-wide search; word lists of unedited pages come from a worker and a cache on disk
+        self.search_builder = SearchIndexBuilder(search_index_dir or default_search_index_dir())
+        self.search_backlog = []  # (page index, entries) not yet merged into the engine's index
+        self.search_merge_pages = 25
+        self.search_poll_id = None
+        self.search_query = ""
+        self.search_hits = []
+        self.search_hit_pages = []  # page of each hit, for bisecting
+        self.search_hit_index = 0
+
+        # Timings of the hot paths; F12 shows them over the canvas and turns profiling on
+        if profile:
+            PROFILER.enable()
+        self.stats_overlay = None
+        self.stats_poll_id = None
+
+        # Files from large_document_mb up are memory-mapped and loaded page by page. With a
+        # memory limit the image cache gets at most a quarter of it, and caches are trimmed
+        # whenever the resident size goes over it, at most once every memory_trim_interval_s.
+        self.large_document_bytes = large_document_mb * 1024 * 1024
+        self.memory_limit = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        if memory_limit_mb:
+            cache_limit_mb = min(cache_limit_mb, memory_limit_mb // 4)
+        self.memory_poll_ms = 2000
+        self.memory_trim_interval_s = 10
+        self.last_memory_trim = None
+
+        # Rasterized page images, keyed by the engine's per-page revisions
+        self.page_cache = PageImageCache(max_bytes=cache_limit_mb * 1024 * 1024)
+        self.prefetcher = PagePrefetcher(depth=prefetch_depth, workers=prefetch_workers)
+        self.prefetch_poll_id = None
+
+        # Unsaved-change tracking; autosave writes a snapshot next to the file off the Tk thread
+        self.autosaved_generation = 0
+        self.autosave_interval_ms = int(autosave_interval_s * 1000)
+        self.autosave_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self.autosave_future = None
+
+        # Resize events are coalesced; a scaled copy of the current bitmap is shown meanwhile
+        self.resize_debounce_ms = 150
+        self.resize_after_id = None
+        self.resize_preview_source = None
+
         self.sentences = []
         self.form_fields = {}
+        self.spatial_index = SpatialIndex()
+        self.hover_item = None
         self.canvas = None
 
         self.drawing = False
-        self.current_stroke = []
-        self.drawings = []  # all strokes (including bounding boxes)
+        self.current_stroke = None
+        self.strokes = {}  # page index -> strokes, stored in PDF coordinates
         self.undo_stack = []  # undo actions
+        self.redo_stack = []
+        # Text and form edits are undone through the engine's page snapshots, kept within this budget
+        self.history_limit = history_limit_mb * 1024 * 1024
+
+        # Freehand ink is simplified on release (tolerance in PDF points, 0 keeps every point)
+        # and optionally written as a fitted curve instead of a polyline
+        self.stroke_tolerance = stroke_tolerance
+        self.smooth_strokes = smooth_strokes
+        self.stroke_stats = {"strokes": 0, "captured": 0, "kept": 0}
+
+        # The stroke being drawn is one canvas line extended in place, at most once per frame
+        self.live_ink_interval_ms = 16
+        self.live_stroke_item = None
+        self.live_stroke_drawn = 0
+        self.live_stroke_flush_id = None
 
         # Dragging state variables
         self.dragging = False
         self.drag_start_x = 0
         self.drag_start_y = 0
+        self.drag_offset_x = 0
+        self.drag_offset_y = 0
         self.content_start_x = 0
         self.content_start_y = 0
         self.moving_content = None
@@ -68,6 +578,14 @@ class PDFEditor:
         self.toggle_button = tk.Button(button_frame, text="Enable Drawing", command=self.toggle_drawing)
         self.toggle_button.pack(side=tk.LEFT, padx=5)
 
+        self.tolerance_label = tk.Label(button_frame, text="Simplify:")
+        self.tolerance_label.pack(side=tk.LEFT, padx=5)
+
+        self.tolerance_spinbox = tk.Spinbox(button_frame, from_=0, to=5, increment=0.25, width=5, command=self.update_stroke_tolerance)
+        self.tolerance_spinbox.delete(0, tk.END)
+        self.tolerance_spinbox.insert(0, self.stroke_tolerance)
+        self.tolerance_spinbox.pack(side=tk.LEFT, padx=5)
+
         self.font_size_label = tk.Label(button_frame, text="Font Size:")
         self.font_size_label.pack(side=tk.LEFT, padx=5)
 
@@ -102,17 +620,109 @@ class PDFEditor:
         self.next_button = tk.Button(nav_button_frame, text="Next Page", command=self.next_page, state=tk.DISABLED)
         self.next_button.pack(side=tk.LEFT, padx=10)
 
-        self.canvas_frame = tk.Frame(self.root, width=self.canvas_width, height=self.canvas_height)
-        self.canvas_frame.pack()
+        self.zoom_out_button = tk.Button(nav_button_frame, text="Zoom Out", command=self.zoom_out)
+        self.zoom_out_button.pack(side=tk.LEFT, padx=5)
+
+        self.zoom_label = tk.Label(nav_button_frame, text="100%", width=5)
+        self.zoom_label.pack(side=tk.LEFT)
+
+        self.zoom_in_button = tk.Button(nav_button_frame, text="Zoom In", command=self.zoom_in)
+        self.zoom_in_button.pack(side=tk.LEFT, padx=5)
+
+        self.zoom_fit_button = tk.Button(nav_button_frame, text="Fit", command=self.zoom_fit)
+        self.zoom_fit_button.pack(side=tk.LEFT, padx=5)
+
+        self.continuous_button = tk.Button(nav_button_frame, text="Continuous Scroll", command=self.toggle_continuous)
+        self.continuous_button.pack(side=tk.LEFT, padx=5)
+
+        self.stroke_stats_label = tk.Label(nav_button_frame, text="")
+        self.stroke_stats_label.pack(side=tk.LEFT, padx=10)
+
+        self.memory_label = tk.Label(nav_button_frame, text="")
+        self.memory_label.pack(side=tk.LEFT, padx=10)
+
+        self.autosave_label = tk.Label(nav_button_frame, text="", fg="red")
+        self.autosave_label.pack(side=tk.LEFT, padx=10)
+
+        search_frame = tk.Frame(nav_frame)
+        search_frame.pack(pady=(5, 0))
+
+        tk.Label(search_frame, text="Find:").pack(side=tk.LEFT)
+        self.search_entry = tk.Entry(search_frame, width=30)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<Return>", lambda e: self.find_next())
+        self.search_entry.bind("<Shift-Return>", lambda e: self.find_previous())
+
+        self.find_prev_button = tk.Button(search_frame, text="Previous Hit", command=self.find_previous)
+        self.find_prev_button.pack(side=tk.LEFT, padx=5)
+
+        self.find_next_button = tk.Button(search_frame, text="Next Hit", command=self.find_next)
+        self.find_next_button.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(search_frame, text="Replace with:").pack(side=tk.LEFT, padx=(10, 0))
+        self.replace_entry = tk.Entry(search_frame, width=30)
+        self.replace_entry.pack(side=tk.LEFT, padx=5)
+
+        self.replace_all_button = tk.Button(search_frame, text="Replace All", command=self.replace_all_text)
+        self.replace_all_button.pack(side=tk.LEFT, padx=5)
+
+        self.search_label = tk.Label(search_frame, text="")
+        self.search_label.pack(side=tk.LEFT, padx=10)
+
+        content_frame = tk.Frame(self.root)
+        content_frame.pack()
+
+        self.thumbnail_frame = tk.Frame(content_frame)
+        self.thumbnail_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 5))
+        self.thumbnail_canvas = tk.Canvas(
+            self.thumbnail_frame, width=self.thumbnails.width + 24, height=self.canvas_height, bg="grey85", highlightthickness=0
+        )
+        self.thumbnail_scrollbar = tk.Scrollbar(self.thumbnail_frame, orient=tk.VERTICAL, command=self.thumbnail_canvas.yview)
+        self.thumbnail_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.thumbnail_canvas.pack(side=tk.LEFT, fill=tk.Y)
+        self.thumbnail_canvas.configure(yscrollcommand=self.on_thumbnail_view_changed)
+        self.thumbnail_canvas.bind("<ButtonPress-1>", self.on_thumbnail_click)
+        self.thumbnail_canvas.bind("<MouseWheel>", lambda e: self.thumbnail_canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        self.thumbnail_canvas.bind("<Button-4>", lambda e: self.thumbnail_canvas.yview_scroll(-1, "units"))
+        self.thumbnail_canvas.bind("<Button-5>", lambda e: self.thumbnail_canvas.yview_scroll(1, "units"))
+
+        self.canvas_frame = tk.Frame(content_frame, width=self.canvas_width, height=self.canvas_height)
+        self.canvas_frame.pack(side=tk.LEFT)
 
         self.canvas = tk.Canvas(self.canvas_frame, width=self.canvas_width, height=self.canvas_height, bg="grey")
         self.canvas.pack(expand=True, fill=tk.BOTH)
+        # Only packed in continuous mode
+        self.scrollbar = tk.Scrollbar(self.canvas_frame, orient=tk.VERTICAL, command=self.on_scrollbar)
         self.canvas.bind("<ButtonPress-1>", self.on_button_press)
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_button_release)
-
-        # Bind Ctrl+Z for undo
+        self.canvas.bind("<Motion>", self.on_canvas_hover)
+        self.canvas.bind("<Shift-ButtonPress-1>", self.on_canvas_shift_click)
+
+        # Wheel pans (Shift for horizontal), Ctrl+wheel zooms, middle button drags the page
+        self.canvas.bind("<MouseWheel>", lambda e: self.on_mouse_wheel(e, "vertical"))
+        self.canvas.bind("<Shift-MouseWheel>", lambda e: self.on_mouse_wheel(e, "horizontal"))
+        self.canvas.bind("<Control-MouseWheel>", lambda e: self.on_mouse_wheel(e, "zoom"))
+        for button in ("<Button-4>", "<Button-5>"):
+            self.canvas.bind(button, lambda e: self.on_mouse_wheel(e, "vertical"))
+            self.canvas.bind(button.replace("<", "<Shift-"), lambda e: self.on_mouse_wheel(e, "horizontal"))
+            self.canvas.bind(button.replace("<", "<Control-"), lambda e: self.on_mouse_wheel(e, "zoom"))
+        self.canvas.bind("<ButtonPress-2>", self.start_pan)
+        self.canvas.bind("<B2-Motion>", self.do_pan)
+        self.canvas.bind("<ButtonRelease-2>", self.end_pan)
+
+        # Bind Ctrl+Z for undo, Ctrl+Y / Ctrl+Shift+Z for redo
         self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+        self.root.bind("<Control-Z>", self.redo)
+        self.root.bind("<Control-s>", self.save_to_original)
+        self.root.bind("<Control-plus>", lambda e: self.zoom_in())
+        self.root.bind("<Control-equal>", lambda e: self.zoom_in())
+        self.root.bind("<Control-minus>", lambda e: self.zoom_out())
+        self.root.bind("<Control-0>", lambda e: self.zoom_fit())
+        self.root.bind("<Control-f>", lambda e: self.search_entry.focus_set())
+        self.root.bind("<F12>", lambda e: self.toggle_stats_overlay())
+        self.root.bind("<Control-T>", lambda e: self.export_trace())
 
         self.root.bind("<Delete>", self.delete_selected_text_event)
         self.root.bind("<Configure>", self.on_window_resize)
@@ -127,6 +737,18 @@ class PDFEditor:
         self.entry_widget.bind("<Escape>", lambda e: self.entry_widget.place_forget())
         self.entry_widget.place_forget()
 
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        if self.autosave_interval_ms > 0:
+            self.root.after(self.autosave_interval_ms, self.autosave)
+        self.root.after(self.memory_poll_ms, self.monitor_memory)
+
+    def on_close(self):
+        self.prefetcher.shutdown()
+        self.thumbnails.shutdown()
+        self.search_builder.shutdown()
+        self.autosave_executor.shutdown(wait=True)
+        self.root.destroy()
+
     def toggle_drawing(self):
         self.drawing = not self.drawing
         if self.drawing:
@@ -142,7 +764,8 @@ class PDFEditor:
         else:
             self.toggle_button.config(text="Enable Drawing")
             self.canvas.config(cursor="")
-            self.current_stroke = []
+            self.discard_live_stroke()
+            self.current_stroke = None
             # Restore default binding to ensure click works for selection too
             # self.canvas.bind("<ButtonPress-1>", self.on_button_press)
             self.canvas.bind("<ButtonPress-1>", self.on_canvas_click)
@@ -154,116 +777,282 @@ class PDFEditor:
             self.on_canvas_click(event)
             return
         # Start pencil-like stroke
-        self.current_stroke = [{"x": event.x, "y": event.y}]
+        self.activate_page_at(event.y)
+        self.discard_live_stroke()
+        self.current_stroke = StrokePoints((event.x, event.y))
+        self.live_stroke_item = self.canvas.create_line(
+            event.x, event.y, event.x, event.y,
+            fill=self.get_color_hex(), width=2, capstyle=tk.ROUND, joinstyle=tk.ROUND, tag="live_stroke"
+        )
+        self.live_stroke_drawn = 1
 
     def on_mouse_drag(self, event):
         if not self.drawing or not self.current_stroke:
             return
-        self.current_stroke.append({"x": event.x, "y": event.y})
-        if len(self.current_stroke) > 1:
-            x1, y1 = self.current_stroke[-2]["x"], self.current_stroke[-2]["y"]
-            x2, y2 = self.current_stroke[-1]["x"], self.current_stroke[-1]["y"]
-            self.canvas.create_line(x1, y1, x2, y2, fill=self.get_color_hex(), width=2, capstyle=tk.ROUND, smooth=True, splinesteps=36)
+        self.current_stroke.append(event.x, event.y)
+        if self.live_stroke_flush_id is None:
+            self.live_stroke_flush_id = self.root.after(self.live_ink_interval_ms, self.flush_live_stroke)
+
+    def flush_live_stroke(self):
+        # Append only the points captured since the last frame to the live line item
+        self.live_stroke_flush_id = None
+        if self.current_stroke is None or self.live_stroke_item is None:
+            return
+        pending = len(self.current_stroke) - self.live_stroke_drawn
+        if pending > 0:
+            self.canvas.insert(self.live_stroke_item, tk.END, self.current_stroke.last(pending))
+            self.live_stroke_drawn += pending
+
+    def discard_live_stroke(self):
+        if self.live_stroke_flush_id is not None:
+            self.root.after_cancel(self.live_stroke_flush_id)
+            self.live_stroke_flush_id = None
+        self.canvas.delete("live_stroke")
+        self.live_stroke_item = None
+        self.live_stroke_drawn = 0
 
     def on_button_release(self, event):
         if not self.drawing or not self.current_stroke:
             return
+        self.discard_live_stroke()
         if len(self.current_stroke) > 1:
+            # Strokes are kept in PDF user space so zooming or resizing never moves them
+            captured = self.current_stroke
+            captured.transform(1 / self.scale_factor, self.crop_x, self.crop_y)
+            points = captured.simplified(self.stroke_tolerance)
+            self.stroke_stats["strokes"] += 1
+            self.stroke_stats["captured"] += len(captured)
+            self.stroke_stats["kept"] += len(points)
+            self.update_stroke_stats()
             stroke = {
                 "type": "stroke",
-                "points": self.current_stroke.copy(),
+                "page": self.current_page_index,
+                "points": points,
                 "color": self.get_color_hex(),
-                "width": 2
+                "width": 2 / self.scale_factor,
+                "bbox": points.bbox(),
+                "captured_points": len(captured)
             }
-            # Compute bounding box for the stroke
-            xs = [p["x"] for p in stroke["points"]]
-            ys = [p["y"] for p in stroke["points"]]
-            stroke["bbox"] = (min(xs), min(ys), max(xs), max(ys))
 
             self.drawings.append(stroke)
+            self.spatial_index.insert("stroke", stroke, stroke["bbox"])
             self.undo_stack.append(stroke)
-        self.current_stroke = []
+            self.redo_stack = []
+            self.draw_stroke(stroke)
+        self.current_stroke = None
 
     def undo(self, event=None):
         if self.undo_stack:
             last_action = self.undo_stack.pop()
             if last_action["type"] == "stroke":
-                if last_action in self.drawings:
-                    self.drawings.remove(last_action)
+                page_strokes = self.strokes.get(last_action["page"], [])
+                if last_action in page_strokes:
+                    page_strokes.remove(last_action)
+                    if last_action["page"] == self.current_page_index:
+                        self.render_page()
+            elif last_action["type"] == "delete_stroke":
+                page_strokes = self.strokes.setdefault(last_action["page"], [])
+                page_strokes.insert(last_action["index"], last_action["stroke"])
+                if last_action["page"] == self.current_page_index:
                     self.render_page()
+            elif last_action["type"] == "edit":
+                if not self.restore_history(self.engine.undo):
+                    return
+            self.redo_stack.append(last_action)
         else:
             print("Undo stack is empty.")
 
+    def redo(self, event=None):
+        if not self.redo_stack:
+            print("Redo stack is empty.")
+            return
+        action = self.redo_stack.pop()
+        if action["type"] == "stroke":
+            self.strokes.setdefault(action["page"], []).append(action)
+            if action["page"] == self.current_page_index:
+                self.render_page()
+        elif action["type"] == "delete_stroke":
+            page_strokes = self.strokes.get(action["page"], [])
+            if action["stroke"] in page_strokes:
+                page_strokes.remove(action["stroke"])
+                if action["page"] == self.current_page_index:
+                    self.render_page()
+        elif action["type"] == "edit":
+            if not self.restore_history(self.engine.redo):
+                return
+        self.undo_stack.append(action)
+
+    def restore_history(self, step):
+        # Restoring reloads the affected pages, so drop everything that holds on to them first
+        self.release_page_references()
+        revisions = dict(self.engine.page_revisions)
+        try:
+            pages = step()
+        except EngineError as e:
+            # The edit is dropped from the history; its pages may be partly restored
+            show_error("Error", str(e))
+            for page_index, revision in self.engine.page_revisions.items():
+                if revisions.get(page_index) != revision:
+                    self.invalidate_page(page_index)
+            self.render_page()
+            return None
+        if pages is None:
+            print("Edit is no longer in the undo history.")
+            return None
+        for page_index in pages:
+            self.invalidate_page(page_index)
+        self.render_page()
+        return pages
+
+    def release_page_references(self):
+        self.text_entry.place_forget()
+        self.entry_widget.place_forget()
+        self.selected_text = None
+        self.selected_sentences = []
+        self.form_fields = {}
+        self.spatial_index.clear()
+        self.hover_item = None
+
+    @property
+    def drawings(self):
+        return self.strokes.setdefault(self.current_page_index, [])
+
     def get_color_hex(self):
         return '#%02x%02x%02x' % self.font_color
 
     def on_window_resize(self, event):
+        # <Configure> on the root also fires for every child widget
+        if event.widget is not self.root:
+            return
         new_width = self.root.winfo_width() - 200
         new_height = self.root.winfo_height() - 200
         new_width = max(new_width, 800)
         new_height = max(new_height, 600)
+        if new_width == self.canvas_width and new_height == self.canvas_height:
+            return
         self.canvas.config(width=new_width, height=new_height)
+        self.thumbnail_canvas.config(height=new_height)
         self.canvas_width = new_width
         self.canvas_height = new_height
+
+        self.show_resize_preview()
+        if self.resize_after_id is not None:
+            self.root.after_cancel(self.resize_after_id)
+        self.resize_after_id = self.root.after(self.resize_debounce_ms, self.finish_resize)
+
+    @holds_engine_lock
+    def show_resize_preview(self):
+        if not self.pdf_document or not getattr(self, "current_image", None):
+            return
+        try:
+            if self.resize_preview_source is None:
+                self.resize_preview_source = (ImageTk.getimage(self.current_image), self.scale_factor)
+            source, source_scale = self.resize_preview_source
+            page = self.engine.page(self.current_page_index)
+            ratio = self.display_scale(page) / source_scale
+            width = max(int(source.width * ratio), 1)
+            height = max(int(source.height * ratio), 1)
+            self.preview_image = ImageTk.PhotoImage(source.resize((width, height), Image.BILINEAR))
+        except Exception:
+            return
+
+        # Overlays are dropped until the full-quality render
+        self.canvas.delete("all")
+        self.canvas.create_image(
+            max((int(self.canvas_width) - width) // 2, 0),
+            max((int(self.canvas_height) - height) // 2, 0),
+            anchor=tk.NW, image=self.preview_image
+        )
+
+    def finish_resize(self):
+        self.resize_after_id = None
+        self.resize_preview_source = None
+        self.preview_image = None
         self.render_page()
 
     def upload_pdf(self):
         self.filepath = filedialog.askopenfilename(filetypes=[("PDF Files", "*.pdf")])
         if not self.filepath:
             return
+        previous_engine = self.engine
         try:
-            self.pdf_document = fitz.open(self.filepath)
-            if not self.pdf_document.is_encrypted:
-                self.current_page_index = 0
-                self.drawings = []
-                self.undo_stack = []
-                self.render_page()
-                self.save_button.config(state=tk.NORMAL)
-                self.add_content_button.config(state=tk.NORMAL)
-                self.update_navigation_buttons()
-            else:
-                messagebox.showerror("Error", "The PDF is encrypted or has editing restrictions.")
-                self.pdf_document.close()
-                self.pdf_document = None
+            large = os.path.getsize(self.filepath) >= self.large_document_bytes
+            self.engine = PDFEngine.open(self.filepath, memory_map=large, history_limit=self.history_limit)
+            self.pdf_document = self.engine.document
+            self.release_page_references()
+            if self.autosave_future is not None:
+                # It may still be serializing the previous document
+                wait([self.autosave_future])
+                self.autosave_future = None
+            if previous_engine is not None:
+                previous_engine.close()
+            self.current_page_index = 0
+            self.crop_x = self.crop_y = 0
+            self.scroll_y = 0
+            self.layout_key = None
+            self.cancel_continuous_rendering()
+            self.autosaved_generation = 0
+            self.page_cache.clear()
+            self.selected_sentences = []
+            self.prefetcher.reset(self.filepath, memory_map=large)
+            self.strokes = {}
+            self.undo_stack = []
+            self.redo_stack = []
+            self.thumbnails.reset(self.filepath, memory_map=large)
+            self.thumbnail_png = {}
+            self.saved_revisions = {}
+            self.stale_thumbnails = set()
+            self.search_builder.reset(self.filepath, self.thumbnails.hash_future, len(self.pdf_document), memory_map=large)
+            self.search_backlog = []
+            self.set_search_hits("", [])
+            self.schedule_search_collection()
+            self.render_page()
+            self.layout_thumbnails()
+            self.save_button.config(state=tk.NORMAL)
+            self.add_content_button.config(state=tk.NORMAL)
+            self.update_navigation_buttons()
+        except EngineError as e:
+            self.engine = None
+            self.pdf_document = None
+            show_error("Error", str(e))
         except Exception as e:
+            self.engine = None
             self.pdf_document = None
-            messagebox.showerror("Error", f"Failed to open PDF: {e}")
+            show_error("Error", f"Failed to open PDF: {e}")
 
+    @holds_engine_lock
+    @PROFILER.timed("render_page")
     def render_page(self):
         if not self.pdf_document:
             return
         try:
-            page = self.pdf_document[self.current_page_index]
-            pdf_width = page.mediabox.width
-            pdf_height = page.mediabox.height
-
-            ratio_width = self.canvas_width / pdf_width
-            ratio_height = self.canvas_height / pdf_height
-
-            self.scale_factor = min(ratio_width, ratio_height)
-            mat = fitz.Matrix(self.scale_factor, self.scale_factor)
-            try:
-                pix = page.get_pixmap(matrix=mat, annot=True)
-            except TypeError:
-                pix = page.get_pixmap(matrix=mat)
-
-            image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            if pix.width < self.canvas_width or pix.height < self.canvas_height:
-                new_image = Image.new("RGB", (int(self.canvas_width), int(self.canvas_height)), "grey")
-                paste_x = (int(self.canvas_width) - pix.width) // 2
-                paste_y = (int(self.canvas_height) - pix.height) // 2
-                new_image.paste(image, (paste_x, paste_y))
-                self.crop_x = -paste_x / self.scale_factor
-                self.crop_y = -paste_y / self.scale_factor
-                image = new_image
-            else:
-                self.crop_x = 0
-                self.crop_y = 0
+            page = self.engine.page(self.current_page_index)
+            if self.continuous:
+                self.ensure_continuous_layout()
+            self.scale_factor = self.display_scale(page)
+            fits = self.continuous or self.clamp_view(page)
 
-            self.current_image = ImageTk.PhotoImage(image)
             self.canvas.delete("all")
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.current_image)
-            self.canvas.image = self.current_image
+            self.visible_tiles = {}
+            if self.continuous:
+                self.current_image = None
+                self.clamp_scroll()
+                self.crop_x, self.crop_y = self.page_origin(self.current_page_index)
+                self.cancel_continuous_rendering()
+                self.continuous_pages = {}
+                self.update_continuous_pages()
+                self.update_scrollbar()
+            elif fits:
+                # The canvas background is already grey, so the page is centred by placement
+                self.current_image = self.get_page_image(page, self.current_page_index, self.scale_factor)
+                self.canvas.create_image(
+                    round(-self.crop_x * self.scale_factor), round(-self.crop_y * self.scale_factor),
+                    anchor=tk.NW, image=self.current_image
+                )
+                self.canvas.image = self.current_image
+            else:
+                self.current_image = None
+                self.update_tiles()
 
             total_pages = len(self.pdf_document)
             self.page_label.config(text=f"Page: {self.current_page_index + 1} / {total_pages}")
@@ -271,23 +1060,12 @@ class PDFEditor:
             self.extract_sentences()
             self.extract_form_fields()
             self.render_form_fields()
+            self.build_spatial_index()
 
             # Redraw drawings
             for drawing in self.drawings:
                 if drawing["type"] == "stroke":
-                    points = drawing["points"]
-                    if len(points) > 1:
-                        flat_points = []
-                        for p in points:
-                            flat_points.extend([p["x"], p["y"]])
-                        self.canvas.create_line(
-                            *flat_points,
-                            fill=drawing["color"],
-                            width=drawing["width"],
-                            capstyle=tk.ROUND,
-                            smooth=True,
-                            splinesteps=36
-                        )
+                    self.draw_stroke(drawing)
 
             # Show dragging feedback if needed
             if self.dragging and self.moving_content and self.moving_content.get("type") != "stroke":
@@ -304,100 +1082,410 @@ class PDFEditor:
             elif self.dragging and self.moving_content and self.moving_content.get("type") == "stroke":
                 # For stroke dragging feedback
                 stroke = self.moving_content["stroke_data"]
-                x0, y0, x1, y1 = stroke["bbox"]
+                x0, y0, x1, y1 = self.pdf_to_canvas_bbox(stroke["bbox"])
                 self.canvas.create_rectangle(x0, y0, x1, y1, outline="orange", width=2, dash=(2, 2), tag="dragging")
 
+            self.highlight_selected_sentences()
+            self.highlight_search_hits()
+            self.schedule_prefetch()
+            self.enforce_memory_limit()
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to render page: {e}")
+            show_error("Error", f"Failed to render page: {e}")
+
+    def draw_stroke(self, drawing, origin=None, tag=None):
+        points = drawing["points"]
+        if len(points) < 2:
+            return
+        crop_x, crop_y = origin or (self.crop_x, self.crop_y)
+        flat_points = points.projected(
+            self.scale_factor, -crop_x * self.scale_factor, -crop_y * self.scale_factor
+        )
+        drawing["canvas_item"] = self.canvas.create_line(
+            *flat_points,
+            fill=drawing["color"],
+            width=drawing["width"] * self.scale_factor,
+            capstyle=tk.ROUND,
+            smooth=True,
+            splinesteps=36,
+            tag=tag
+        )
+
+    def page_fit_scale(self, page):
+        return min(self.canvas_width / page.mediabox.width, self.canvas_height / page.mediabox.height)
+
+    def display_scale(self, page):
+        if self.continuous:
+            return self.continuous_scale
+        return self.page_fit_scale(page) * self.zoom
+
+    def toggle_continuous(self):
+        if not self.pdf_document:
+            return
+        self.continuous = not self.continuous
+        if self.continuous:
+            self.continuous_button.config(text="Single Page")
+            self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y, before=self.canvas)
+            self.ensure_continuous_layout()
+            self.scroll_y = self.page_tops[self.current_page_index]
+            zoom_state = tk.DISABLED
+        else:
+            self.continuous_button.config(text="Continuous Scroll")
+            self.scrollbar.pack_forget()
+            self.cancel_continuous_rendering()
+            self.continuous_pages = {}
+            self.crop_x = self.crop_y = 0
+            zoom_state = tk.NORMAL
+        for button in (self.zoom_out_button, self.zoom_in_button, self.zoom_fit_button):
+            button.config(state=zoom_state)
+        self.render_page()
+
+    def ensure_continuous_layout(self):
+        key = (id(self.engine), self.canvas_width)
+        if key == self.layout_key:
+            return
+        # Keep the same relative position when only the window width changed
+        position = None
+        if self.layout_key is not None and self.layout_key[0] == key[0] and self.continuous_height:
+            position = self.scroll_y / self.continuous_height
+        sizes = self.engine.page_sizes()
+        self.continuous_scale = (self.canvas_width - 2 * self.page_gap) / max(width for width, _ in sizes)
+        self.page_tops = []
+        top = self.page_gap
+        for _, height in sizes:
+            self.page_tops.append(top)
+            top += height * self.continuous_scale + self.page_gap
+        self.continuous_height = top
+        self.layout_key = key
+        if position is not None:
+            self.scroll_y = position * self.continuous_height
+
+    def clamp_scroll(self):
+        self.scroll_y = min(max(self.scroll_y, 0), max(self.continuous_height - self.canvas_height, 0))
+
+    def page_at(self, y):
+        # Page whose slot (including the gap below it) contains the document y offset
+        index = bisect.bisect_right(self.page_tops, y) - 1
+        return min(max(index, 0), len(self.page_tops) - 1)
+
+    def page_origin(self, page_index):
+        # crop_x/crop_y that map this page's PDF coordinates onto the continuous canvas
+        width = self.engine.page_sizes()[page_index][0]
+        paste_x = max(int(self.canvas_width - width * self.scale_factor), 0) // 2
+        return -paste_x / self.scale_factor, (self.scroll_y - self.page_tops[page_index]) / self.scale_factor
+
+    def update_continuous_pages(self):
+        # Keep pages within half a viewport of the visible area on the canvas and evict the rest
+        margin = self.canvas_height // 2
+        wanted = range(self.page_at(self.scroll_y - margin), self.page_at(self.scroll_y + self.canvas_height + margin) + 1)
+        for page_index in [p for p in self.continuous_pages if p not in wanted]:
+            del self.continuous_pages[page_index]
+            self.canvas.delete(f"page{page_index}")
+        self.continuous_queue = [p for p in self.continuous_queue if p in wanted]
+
+        centre = self.page_at(self.scroll_y + self.canvas_height / 2)
+        for page_index in sorted(wanted, key=lambda p: abs(p - centre)):
+            if page_index in self.continuous_pages:
+                continue
+            width, height = self.engine.page_sizes()[page_index]
+            x0, y0 = self.pdf_to_canvas_bbox((0, 0, 0, 0), self.page_origin(page_index))[:2]
+            placeholder = self.canvas.create_rectangle(
+                x0, y0, x0 + width * self.scale_factor, y0 + height * self.scale_factor,
+                fill="white", outline="gray60", tags=("page_placeholder", f"page{page_index}")
+            )
+            self.canvas.tag_lower(placeholder)
+            self.continuous_pages[page_index] = placeholder
+            if page_index != self.current_page_index:
+                # The current page's strokes are drawn by render_page with the other overlays
+                for drawing in self.strokes.get(page_index, []):
+                    self.draw_stroke(drawing, self.page_origin(page_index), tag=f"page{page_index}")
+
+            key = PageImageCache.make_key(page_index, self.scale_factor, self.engine.page_revision(page_index))
+            if page_index == self.current_page_index or key in self.page_cache:
+                self.place_continuous_page(page_index)
+            else:
+                self.continuous_queue.append(page_index)
+        if self.continuous_queue and self.continuous_render_id is None:
+            self.continuous_render_id = self.root.after(1, self.render_queued_pages)
+
+    @holds_engine_lock
+    def place_continuous_page(self, page_index):
+        image = self.get_page_image(self.engine.page(page_index), page_index, self.scale_factor)
+        x0, y0 = self.pdf_to_canvas_bbox((0, 0, 0, 0), self.page_origin(page_index))[:2]
+        item = self.canvas.create_image(round(x0), round(y0), anchor=tk.NW, image=image, tags=("page_image", f"page{page_index}"))
+        self.canvas.tag_lower(item)
+        self.canvas.delete(self.continuous_pages[page_index])
+        self.continuous_pages[page_index] = image
+
+    def render_queued_pages(self):
+        # One page per event-loop turn, nearest to the centre of the viewport first
+        self.continuous_render_id = None
+        if not self.continuous or not self.continuous_queue:
+            return
+        page_index = self.continuous_queue.pop(0)
+        if page_index in self.continuous_pages:
+            self.place_continuous_page(page_index)
+        if self.continuous_queue:
+            self.continuous_render_id = self.root.after(1, self.render_queued_pages)
+
+    def cancel_continuous_rendering(self):
+        if self.continuous_render_id is not None:
+            self.root.after_cancel(self.continuous_render_id)
+            self.continuous_render_id = None
+        self.continuous_queue = []
+
+    def scroll_by(self, dy):
+        old_y = self.scroll_y
+        self.scroll_y += dy
+        self.clamp_scroll()
+        shift = round(self.scroll_y - old_y)
+        self.scroll_y = old_y + shift
+        if not shift:
+            return
+        self.canvas.move("all", 0, -shift)
+        self.crop_y += shift / self.scale_factor
+        self.hover_item = None
+        self.canvas.delete("hover")
+        centre = self.page_at(self.scroll_y + self.canvas_height / 2)
+        if centre != self.current_page_index:
+            # Overlays (text, fields, selection) follow the page in the middle of the view
+            self.current_page_index = centre
+            self.selected_sentences = []
+            self.render_page()
+            self.update_navigation_buttons()
+            return
+        self.update_continuous_pages()
+        self.update_scrollbar()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if not self.continuous:
+            return
+        if action == "moveto":
+            target = float(amount) * self.continuous_height
+        else:
+            step = self.canvas_height * 0.9 if unit == "pages" else 60
+            target = self.scroll_y + int(amount) * step
+        self.scroll_by(target - self.scroll_y)
+
+    def update_scrollbar(self):
+        if self.continuous_height:
+            self.scrollbar.set(self.scroll_y / self.continuous_height, min((self.scroll_y + self.canvas_height) / self.continuous_height, 1))
+
+    def activate_page_at(self, y):
+        # In continuous mode a click on another visible page makes it the page being edited
+        if not self.continuous or not self.pdf_document:
+            return
+        page_index = self.page_at(self.scroll_y + y)
+        if page_index != self.current_page_index:
+            self.current_page_index = page_index
+            self.selected_sentences = []
+            self.render_page()
+            self.update_navigation_buttons()
+
+    def clamp_view(self, page):
+        # Centre each axis the page does not fill, otherwise keep the viewport on the page.
+        # Returns True when the whole page is visible and can be shown as one image.
+        fits = True
+        for axis, extent, view in (("x", page.mediabox.width, self.canvas_width), ("y", page.mediabox.height, self.canvas_height)):
+            attr = "crop_" + axis
+            page_pixels = extent * self.scale_factor
+            if page_pixels <= view + 0.5:
+                setattr(self, attr, -(max(int(view - page_pixels), 0) // 2) / self.scale_factor)
+            else:
+                fits = False
+                setattr(self, attr, min(max(getattr(self, attr), 0), extent - view / self.scale_factor))
+        return fits
+
+    @holds_engine_lock
+    def update_tiles(self):
+        # Show the tiles intersecting the viewport and drop the ones scrolled out of it
+        page = self.engine.page(self.current_page_index)
+        size = self.tile_size
+        left = self.crop_x * self.scale_factor
+        top = self.crop_y * self.scale_factor
+        right = min(left + self.canvas_width, page.rect.width * self.scale_factor) - 1
+        bottom = min(top + self.canvas_height, page.rect.height * self.scale_factor) - 1
+        wanted = {
+            (tx, ty)
+            for tx in range(max(int(left // size), 0), int(right // size) + 1)
+            for ty in range(max(int(top // size), 0), int(bottom // size) + 1)
+        }
+        for tile in [t for t in self.visible_tiles if t not in wanted]:
+            self.canvas.delete(self.visible_tiles.pop(tile)[0])
+        for tile in sorted(wanted - self.visible_tiles.keys()):
+            image = self.get_tile_image(page, self.current_page_index, self.scale_factor, tile)
+            item = self.canvas.create_image(tile[0] * size - left, tile[1] * size - top, anchor=tk.NW, image=image, tag="page_tile")
+            self.canvas.tag_lower(item)
+            self.visible_tiles[tile] = (item, image)
+
+    def get_tile_image(self, page, page_index, scale_factor, tile):
+        key = PageImageCache.make_key(page_index, scale_factor, self.engine.page_revision(page_index), tile)
+        image = self.page_cache.get(key)
+        if image is not None:
+            return image
+        rendered = render_page_ppm(page, scale_factor, clip=tile_clip(page, scale_factor, tile, self.tile_size))
+        return self.cache_page_image(key, rendered)
+
+    @holds_engine_lock
+    def set_zoom(self, zoom, anchor_x=None, anchor_y=None):
+        if not self.pdf_document or self.continuous:
+            return
+        zoom = min(max(zoom, ZOOM_LEVELS[0]), ZOOM_LEVELS[-1])
+        if anchor_x is None:
+            anchor_x, anchor_y = self.canvas_width / 2, self.canvas_height / 2
+        # Keep the PDF point under the anchor in place
+        pdf_x = anchor_x / self.scale_factor + self.crop_x
+        pdf_y = anchor_y / self.scale_factor + self.crop_y
+        self.zoom = zoom
+        scale_factor = self.page_fit_scale(self.engine.page(self.current_page_index)) * zoom
+        self.crop_x = pdf_x - anchor_x / scale_factor
+        self.crop_y = pdf_y - anchor_y / scale_factor
+        self.zoom_label.config(text=f"{round(zoom * 100)}%")
+        self.render_page()
+
+    def zoom_in(self, anchor_x=None, anchor_y=None):
+        self.set_zoom(next((z for z in ZOOM_LEVELS if z > self.zoom + 1e-6), ZOOM_LEVELS[-1]), anchor_x, anchor_y)
+
+    def zoom_out(self, anchor_x=None, anchor_y=None):
+        self.set_zoom(next((z for z in reversed(ZOOM_LEVELS) if z < self.zoom - 1e-6), ZOOM_LEVELS[0]), anchor_x, anchor_y)
+
+    def zoom_fit(self):
+        self.set_zoom(1.0)
+
+    def on_mouse_wheel(self, event, action):
+        # Button-4/5 on X11, signed delta on Windows and macOS
+        towards_user = event.num == 5 or event.delta < 0
+        if action == "zoom":
+            if towards_user:
+                self.zoom_out(event.x, event.y)
+            else:
+                self.zoom_in(event.x, event.y)
+        elif action == "horizontal":
+            self.pan_by(60 if towards_user else -60, 0)
+        else:
+            self.pan_by(0, 60 if towards_user else -60)
+        return "break"
+
+    def start_pan(self, event):
+        self.pan_last = (event.x, event.y)
+
+    def do_pan(self, event):
+        if self.pan_last is None:
+            return
+        last_x, last_y = self.pan_last
+        self.pan_last = (event.x, event.y)
+        self.pan_by(last_x - event.x, last_y - event.y)
+
+    def end_pan(self, event):
+        self.pan_last = None
+
+    @holds_engine_lock
+    def pan_by(self, dx, dy):
+        # Scroll the existing canvas items and only rasterize tiles that come into view
+        if self.continuous:
+            self.scroll_by(dy)
+            return
+        if not self.pdf_document or self.current_image is not None:
+            return
+        page = self.engine.page(self.current_page_index)
+        old_x, old_y = self.crop_x, self.crop_y
+        self.crop_x += dx / self.scale_factor
+        self.crop_y += dy / self.scale_factor
+        self.clamp_view(page)
+        shift_x = round((self.crop_x - old_x) * self.scale_factor)
+        shift_y = round((self.crop_y - old_y) * self.scale_factor)
+        self.crop_x = old_x + shift_x / self.scale_factor
+        self.crop_y = old_y + shift_y / self.scale_factor
+        if not shift_x and not shift_y:
+            return
+        self.canvas.move("all", -shift_x, -shift_y)
+        self.hover_item = None
+        self.canvas.delete("hover")
+        self.update_tiles()
+
+    def get_page_image(self, page, page_index, scale_factor):
+        key = PageImageCache.make_key(page_index, scale_factor, self.engine.page_revision(page_index))
+        image = self.page_cache.get(key)
+        if image is not None:
+            return image
+
+        rendered = self.prefetcher.take(key)
+        if rendered is None:
+            rendered = render_page_ppm(page, scale_factor)
+        return self.cache_page_image(key, rendered)
+
+    def cache_page_image(self, key, rendered):
+        image = tk.PhotoImage(data=rendered, format="ppm")
+        # Tk keeps 4 bytes per pixel for photo images
+        self.page_cache.put(key, image, image.width() * image.height() * 4)
+        return image
+
+    @holds_engine_lock
+    def schedule_prefetch(self):
+        # Only whole-page images are prefetched; zoomed-in pages are tiled on demand
+        if not self.pdf_document or self.prefetcher.executor is None or self.zoom > 1:
+            return
+        for distance in range(1, self.prefetcher.depth + 1):
+            for page_index in (self.current_page_index + distance, self.current_page_index - distance):
+                if not 0 <= page_index < len(self.pdf_document):
+                    continue
+                # Workers read the file on disk, which does not contain unsaved edits
+                if self.engine.page_revision(page_index):
+                    continue
+                scale_factor = self.display_scale(self.engine.page(page_index))
+                key = PageImageCache.make_key(page_index, scale_factor, 0)
+                if key not in self.page_cache:
+                    self.prefetcher.submit(key)
+        if self.prefetcher.pending and self.prefetch_poll_id is None:
+            self.prefetch_poll_id = self.root.after(30, self.collect_prefetched_pages)
+
+    def collect_prefetched_pages(self):
+        self.prefetch_poll_id = None
+        for key, rendered in self.prefetcher.pop_finished():
+            if key[2] == self.engine.page_revision(key[0]):
+                self.cache_page_image(key, rendered)
+        if self.prefetcher.pending:
+            self.prefetch_poll_id = self.root.after(30, self.collect_prefetched_pages)
+
+    def apply_edits(self, *operations):
+        pages = self.engine.apply(*operations)
+        self.edits_applied(pages)
+        return pages
+
+    def edits_applied(self, pages):
+        if pages and self.engine.history.enabled:
+            self.undo_stack.append({"type": "edit", "pages": pages})
+            self.redo_stack = []
+        for page_index in pages:
+            self.invalidate_page(page_index)
+
+    def invalidate_page(self, page_index):
+        self.page_cache.invalidate_page(page_index)
+        self.prefetcher.cancel_page(page_index)
+        self.thumbnails.pending.pop(page_index, None)
+        if page_index in self.thumbnail_items:
+            self.schedule_thumbnail_refresh(page_index)
+        if page_index == self.current_page_index:
+            self.selected_sentences = []
 
     def extract_sentences(self):
         if not self.pdf_document:
             self.sentences = []
             return
         try:
-            page = self.pdf_document[self.current_page_index]
-            words = page.get_text("words")
-            words.sort(key=lambda w: (w[1], w[0]))
-
-            sentences = []
-            current_sentence = []
-            current_sentence_words = []
-            current_block_no = None
-            current_line_no = None
-
-            for word in words:
-                x0, y0, x1, y1, text, block_no, line_no, word_no = word
-                if current_sentence and (block_no != current_block_no or line_no != current_line_no):
-                    if current_sentence:
-                        sentence_text = ' '.join(current_sentence)
-                        sentences.append({
-                            "text": sentence_text,
-                            "words": current_sentence_words.copy(),
-                            "rect": self.calculate_sentence_rect(current_sentence_words)
-                        })
-                        current_sentence = []
-                        current_sentence_words = []
-                if not current_sentence:
-                    current_sentence_words = []
-                current_sentence.append(text)
-                current_sentence_words.append(word)
-                if text.endswith(('.', '!', '?')):
-                    sentence_text = ' '.join(current_sentence)
-                    sentences.append({
-                        "text": sentence_text,
-                        "words": current_sentence_words.copy(),
-                        "rect": self.calculate_sentence_rect(current_sentence_words)
-                    })
-                    current_sentence = []
-                    current_sentence_words = []
-                current_block_no = block_no
-                current_line_no = line_no
-
-            if current_sentence:
-                sentence_text = ' '.join(current_sentence)
-                sentences.append({
-                    "text": sentence_text,
-                    "words": current_sentence_words.copy(),
-                    "rect": self.calculate_sentence_rect(current_sentence_words)
-                })
-
-            self.sentences = sentences
+            self.sentences = self.engine.sentences(self.current_page_index)
         except Exception as e:
             self.sentences = []
-            messagebox.showerror("Error", f"Failed to extract sentences: {e}")
-
-    def calculate_sentence_rect(self, words):
-        try:
-            x0 = min(w[0] for w in words) - 2
-            y0 = min(w[1] for w in words) - 2
-            x1 = max(w[2] for w in words) + 2
-            y1 = max(w[3] for w in words) + 2
-            return fitz.Rect(x0, y0, x1, y1)
-        except Exception:
-            return fitz.Rect(0, 0, 0, 0)
+            show_error("Error", f"Failed to extract sentences: {e}")
 
     def extract_form_fields(self):
+        # Only the current page's fields are kept
         if not self.pdf_document:
-            self.form_fields[self.current_page_index] = []
+            self.form_fields = {self.current_page_index: []}
             return
         try:
-            page = self.pdf_document[self.current_page_index]
-            widgets = page.widgets()
-            form_fields = []
-            if widgets:
-                for widget in widgets:
-                    field_type = widget.field_type
-                    field_flag_checkbox = getattr(widget, 'field_flag_checkbox', False)
-                    is_checkbox = (field_type == "Btn" and field_flag_checkbox)
-                    form_fields.append({
-                        "field_name": widget.field_name,
-                        "field_type": "checkbox" if is_checkbox else field_type,
-                        "rect": widget.rect,
-                        "widget": widget
-                    })
-            self.form_fields[self.current_page_index] = form_fields
+            self.form_fields = {self.current_page_index: self.engine.form_fields(self.current_page_index)}
         except Exception:
-            self.form_fields[self.current_page_index] = []
+            self.form_fields = {self.current_page_index: []}
 
     def render_form_fields(self):
         form_fields = self.form_fields.get(self.current_page_index, [])
@@ -414,9 +1502,9 @@ class PDFEditor:
             )
 
             if field["field_type"] == "checkbox":
-                export_value = field["widget"].export_value
-                field_value = field["widget"].field_value
-                is_checked = (export_value and field_value == export_value) or (not export_value and field_value in ["Yes", "On"])
+                export_value = field["export_value"]
+                field_value = field["value"]
+                is_checked = field_value == export_value or field_value in ["Yes", "On"]
 
                 if is_checked:
                     padding = 4
@@ -431,6 +1519,50 @@ class PDFEditor:
                         fill="green", width=2, tag="form_field"
                     )
 
+    def pdf_to_canvas_bbox(self, bbox, origin=None):
+        x0, y0, x1, y1 = bbox
+        crop_x, crop_y = origin or (self.crop_x, self.crop_y)
+        return (
+            (x0 - crop_x) * self.scale_factor,
+            (y0 - crop_y) * self.scale_factor,
+            (x1 - crop_x) * self.scale_factor,
+            (y1 - crop_y) * self.scale_factor,
+        )
+
+    def build_spatial_index(self):
+        self.spatial_index.clear()
+        self.hover_item = None
+        for field in self.form_fields.get(self.current_page_index, []):
+            self.spatial_index.insert("form_field", field, field["rect"])
+        for sentence in self.sentences:
+            self.spatial_index.insert("text", sentence, sentence["rect"])
+        for drawing in self.drawings:
+            if drawing["type"] == "stroke":
+                self.spatial_index.insert("stroke", drawing, drawing["bbox"])
+
+    def on_canvas_hover(self, event):
+        if not self.pdf_document or self.drawing or self.dragging:
+            return
+        pdf_x = event.x / self.scale_factor + self.crop_x
+        pdf_y = event.y / self.scale_factor + self.crop_y
+        hits = self.spatial_index.query_point(pdf_x, pdf_y)
+        hover_item = hits[0] if hits else None
+        if hover_item is self.hover_item:
+            return
+        self.hover_item = hover_item
+        self.canvas.delete("hover")
+        if hover_item is None:
+            return
+        if hover_item.get("type") == "stroke":
+            x0, y0, x1, y1 = self.pdf_to_canvas_bbox(hover_item["bbox"])
+        else:
+            rect = hover_item["rect"]
+            x0 = (rect.x0 - self.crop_x) * self.scale_factor
+            y0 = (rect.y0 - self.crop_y) * self.scale_factor
+            x1 = (rect.x1 - self.crop_x) * self.scale_factor
+            y1 = (rect.y1 - self.crop_y) * self.scale_factor
+        self.canvas.create_rectangle(x0, y0, x1, y1, outline="gray30", width=1, dash=(1, 2), tag="hover")
+
     def highlight_selected_sentence(self, rect):
         canvas_x0 = (rect.x0 - self.crop_x) * self.scale_factor
         canvas_y0 = (rect.y0 - self.crop_y) * self.scale_factor
@@ -448,7 +1580,7 @@ class PDFEditor:
         self.canvas.create_rectangle(canvas_x0, canvas_y0, canvas_x1, canvas_y1, outline="green", width=2, tag="highlight")
 
     def highlight_selected_stroke(self, bbox):
-        x0, y0, x1, y1 = bbox
+        x0, y0, x1, y1 = self.pdf_to_canvas_bbox(bbox)
         self.canvas.delete("highlight")
         self.canvas.create_rectangle(x0, y0, x1, y1, outline="purple", width=2, tag="highlight")
 
@@ -479,10 +1611,9 @@ class PDFEditor:
 
     def erase_original_text(self, rect):
         try:
-            self.selected_text["page"].add_redact_annot(rect, fill=(1, 1, 1))
-            self.selected_text["page"].apply_redactions()
+            self.apply_edits(DeleteText(self.current_page_index, rect))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to erase original text: {e}")
+            show_error("Error", f"Failed to erase original text: {e}")
 
     def insert_new_text(self, event=None):
         if not self.typing_content:
@@ -492,33 +1623,22 @@ class PDFEditor:
         x_canvas = self.text_entry.winfo_x()
         y_canvas = self.text_entry.winfo_y()
 
-        pdf_x = (x_canvas + self.crop_x) / self.scale_factor
-        pdf_y = (y_canvas + self.crop_y) / self.scale_factor
+        pdf_x = x_canvas / self.scale_factor + self.crop_x
+        pdf_y = y_canvas / self.scale_factor + self.crop_y
 
-        page = self.pdf_document[self.current_page_index]
         text = self.text_entry.get(1.0, tk.END).strip()
 
         if text:
             try:
-                font_family = self.font_family_var.get()
-                font_mapping = {
-                    "helvetica": "helv",
-                    "times": "times",
-                    "courier": "courier",
-                    "arial": "helv",
-                    "symbol": "symbol",
-                }
-                fitz_font_name = font_mapping.get(font_family.lower(), "helv")
                 insertion_point = (pdf_x + 20, pdf_y + self.font_size / 2)
-                font_color_normalized = tuple(c / 255 for c in self.font_color)
-
-                page.insert_text(
+                self.apply_edits(InsertText(
+                    self.current_page_index,
                     insertion_point,
                     text,
-                    fontsize=self.font_size,
-                    fontname=fitz_font_name,
-                    color=font_color_normalized,
-                )
+                    font_size=self.font_size,
+                    font_family=self.font_family_var.get(),
+                    color=self.font_color,
+                ))
 
                 self.render_page()
                 self.text_entry.delete(1.0, tk.END)
@@ -528,7 +1648,7 @@ class PDFEditor:
                 self.text_entry.unbind("<Control-Return>")
                 self.text_entry.bind("<Control-Return>", self.update_text_content)
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to add text: {e}")
+                show_error("Error", f"Failed to add text: {e}")
         else:
             messagebox.showwarning("Warning", "No text entered.")
 
@@ -540,40 +1660,18 @@ class PDFEditor:
             return
 
         new_text = self.text_entry.get(1.0, tk.END).strip()
-        page = self.selected_text["page"]
-        rect = self.selected_text["rect"]
-        font_size = self.font_size
-        font_family = self.font_family_var.get()
-
-        # Erase original text
-        try:
-            page.add_redact_annot(rect, fill=(1, 1, 1))
-            page.apply_redactions()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to erase original text: {e}")
-            return
-
-        font_mapping = {
-            "helvetica": "helv",
-            "times": "times",
-            "courier": "courier",
-            "arial": "helv",
-            "symbol": "symbol",
-        }
-
-        fitz_font_name = font_mapping.get(font_family.lower(), "helv")
-        insertion_point = (rect.x0, rect.y0 + ((rect.y1 - rect.y0) / 2) + font_size / 2)
-
         try:
-            page.insert_text(
-                insertion_point,
+            # Erases the original text and inserts the new one in a single content rewrite
+            self.apply_edits(ReplaceText(
+                self.current_page_index,
+                self.selected_text["rect"],
                 new_text,
-                fontsize=font_size,
-                fontname=fitz_font_name,
+                font_size=self.font_size,
+                font_family=self.font_family_var.get(),
                 color=self.font_color,
-            )
+            ))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to insert text: {e}")
+            show_error("Error", f"Failed to update text: {e}")
             return
 
         self.text_entry.place_forget()
@@ -590,72 +1688,58 @@ class PDFEditor:
             messagebox.showwarning("Warning", "No text entered.")
             return
 
-        self.extract_form_fields()
-        page_widgets = self.form_fields.get(self.current_page_index, [])
-        widget = None
-        for fw in page_widgets:
-            if fw["field_name"] == self.selected_text["field_name"]:
-                widget = fw["widget"]
-                self.selected_text["widget"] = widget
-                self.selected_text["rect"] = fw["rect"]
-                break
-
-        if not widget:
+        if self.engine.field_index.get(self.selected_text["field_name"], self.current_page_index) is None:
             messagebox.showwarning("Warning", "Form field not found or invalid.")
             return
 
         try:
-            widget.field_value = new_text
-            widget.update()
+            self.apply_edits(FillField(self.selected_text["field_name"], new_text, page=self.current_page_index))
             self.render_page()
             self.entry_widget.delete(0, tk.END)
             self.entry_widget.place_forget()
             self.selected_text = None
             messagebox.showinfo("Success", "Form field updated successfully!")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to update form field: {e}")
+            show_error("Error", f"Failed to update form field: {e}")
             return
 
     def delete_selected_text_event(self, event=None):
         self.delete_selected_text()
 
     def delete_selected_text(self, event=None):
+        if self.selected_sentences:
+            self.delete_selected_sentences()
+            return
         if not self.selected_text:
             messagebox.showwarning("Warning", "No text or form field selected to delete.")
             return
 
         if self.selected_text["type"] == "stroke":
-            # Delete a selected stroke
+            # Strokes are not in the PDF until it is saved, so their deletion is recorded on the
+            # undo stack next to the edits apply_edits records
             stroke_data = self.selected_text.get("stroke_data")
             if stroke_data in self.drawings:
+                index = self.drawings.index(stroke_data)
                 self.drawings.remove(stroke_data)
-                if stroke_data in self.undo_stack:
-                    self.undo_stack.remove(stroke_data)
+                self.spatial_index.remove(stroke_data)
+                self.undo_stack.append({"type": "delete_stroke", "page": stroke_data["page"], "stroke": stroke_data, "index": index})
+                self.redo_stack = []
                 self.selected_text = None
                 self.render_page()
                 messagebox.showinfo("Success", "Selected stroke deleted successfully.")
             return
 
-        page = self.selected_text["page"]
         rect = self.selected_text["rect"]
 
         try:
             if self.selected_text["type"] == "text":
-                page.add_redact_annot(rect, fill=(1, 1, 1))
-                page.apply_redactions()
+                self.apply_edits(DeleteText(self.current_page_index, rect))
             elif self.selected_text["type"] == "form_field":
-                self.extract_form_fields()
-                fields = self.form_fields.get(self.current_page_index, [])
-                widget = None
-                for fw in fields:
-                    if fw["field_name"] == self.selected_text["field_name"]:
-                        widget = fw["widget"]
-                        break
-                if widget:
-                    page.delete_widget(widget)
-                else:
+                field_name = self.selected_text["field_name"]
+                if self.engine.field_index.get(field_name, self.current_page_index) is None:
                     messagebox.showwarning("Warning", "Form field not found.")
                     return
+                self.apply_edits(DeleteField(field_name, page=self.current_page_index))
             else:
                 messagebox.showwarning("Warning", "Unknown selection type.")
                 return
@@ -664,7 +1748,63 @@ class PDFEditor:
             self.selected_text = None
             messagebox.showinfo("Success", "Selected content deleted successfully.")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to delete content: {e}")
+            show_error("Error", f"Failed to delete content: {e}")
+
+    def on_canvas_shift_click(self, event):
+        if not self.pdf_document or self.drawing:
+            return
+        self.activate_page_at(event.y)
+        pdf_x = event.x / self.scale_factor + self.crop_x
+        pdf_y = event.y / self.scale_factor + self.crop_y
+        hits = self.spatial_index.query_point(pdf_x, pdf_y, "text")
+        if not hits:
+            return "break"
+        sentence = hits[0]
+        if sentence in self.selected_sentences:
+            self.selected_sentences.remove(sentence)
+        else:
+            self.selected_sentences.append(sentence)
+        self.highlight_selected_sentences()
+        return "break"
+
+    def highlight_selected_sentences(self):
+        self.canvas.delete("multi_highlight")
+        for sentence in self.selected_sentences:
+            rect = sentence["rect"]
+            self.canvas.create_rectangle(
+                (rect.x0 - self.crop_x) * self.scale_factor,
+                (rect.y0 - self.crop_y) * self.scale_factor,
+                (rect.x1 - self.crop_x) * self.scale_factor,
+                (rect.y1 - self.crop_y) * self.scale_factor,
+                outline="red", width=2, dash=(3, 2), tag="multi_highlight"
+            )
+
+    def delete_selected_sentences(self):
+        count = len(self.selected_sentences)
+        operations = [DeleteText(self.current_page_index, s["rect"]) for s in self.selected_sentences]
+        try:
+            self.apply_edits(*operations)
+        except Exception as e:
+            show_error("Error", f"Failed to delete content: {e}")
+            return
+        self.selected_sentences = []
+        self.selected_text = None
+        self.render_page()
+        messagebox.showinfo("Success", f"{count} sentences deleted successfully.")
+
+    def update_stroke_tolerance(self):
+        try:
+            self.stroke_tolerance = max(0.0, float(self.tolerance_spinbox.get()))
+        except ValueError:
+            show_error("Error", "Invalid simplification tolerance entered.")
+
+    def update_stroke_stats(self):
+        captured = self.stroke_stats["captured"]
+        removed = captured - self.stroke_stats["kept"]
+        percent = 100 * removed / captured if captured else 0
+        self.stroke_stats_label.config(
+            text=f"Ink: {self.stroke_stats['strokes']} strokes, {removed} of {captured} points removed ({percent:.0f}%)"
+        )
 
     def update_font_size(self):
         try:
@@ -676,7 +1816,7 @@ class PDFEditor:
                 current_font = (self.font_family_var.get(), self.font_size)
                 self.entry_widget.configure(font=current_font)
         except ValueError:
-            messagebox.showerror("Error", "Invalid font size entered.")
+            show_error("Error", "Invalid font size entered.")
 
     def select_color(self):
         color = colorchooser.askcolor()[0]
@@ -685,21 +1825,256 @@ class PDFEditor:
 
     def next_page(self):
         if self.current_page_index < len(self.pdf_document) - 1:
-            self.current_page_index += 1
-            self.drawings = []
-            self.undo_stack = []
-            self.render_page()
-            self.update_navigation_buttons()
+            self.go_to_page(self.current_page_index + 1)
 
     def prev_page(self):
         if self.current_page_index > 0:
-            self.current_page_index -= 1
-            self.drawings = []
-            self.undo_stack = []
-            self.render_page()
-            self.update_navigation_buttons()
+            self.go_to_page(self.current_page_index - 1)
+
+    def go_to_page(self, page_index):
+        if not self.pdf_document or not 0 <= page_index < len(self.pdf_document):
+            return
+        self.current_page_index = page_index
+        self.selected_sentences = []
+        self.crop_y = 0
+        if self.continuous:
+            self.scroll_y = self.page_tops[page_index]
+        self.render_page()
+        self.update_navigation_buttons()
+
+    def layout_thumbnails(self):
+        # Placeholders for every page come from the mediaboxes; images are added as rows scroll into view
+        self.thumbnail_canvas.delete("all")
+        self.thumbnail_items = {}
+        self.thumbnail_tops = []
+        width = self.thumbnails.width
+        top = 8
+        for page_index, (page_width, page_height) in enumerate(self.engine.page_sizes()):
+            height = page_height * width / page_width
+            self.thumbnail_tops.append(top)
+            self.thumbnail_canvas.create_rectangle(12, top, 12 + width, top + height, fill="white", outline="gray60")
+            self.thumbnail_canvas.create_text(12 + width / 2, top + height + 9, text=str(page_index + 1))
+            top += height + 24
+        self.thumbnail_tops.append(top)
+        self.thumbnail_canvas.configure(scrollregion=(0, 0, width + 24, top))
+        self.thumbnail_canvas.yview_moveto(0)
+        self.update_thumbnails()
+
+    def on_thumbnail_view_changed(self, first, last):
+        self.thumbnail_scrollbar.set(first, last)
+        self.update_thumbnails()
+
+    def on_thumbnail_click(self, event):
+        if not self.thumbnail_tops:
+            return
+        y = self.thumbnail_canvas.canvasy(event.y)
+        self.go_to_page(min(max(bisect.bisect_right(self.thumbnail_tops, y) - 1, 0), len(self.pdf_document) - 1))
+
+    def update_thumbnails(self):
+        # Only rows within one strip height of the visible part hold images
+        if not self.pdf_document or not self.thumbnail_tops:
+            return
+        view_top = self.thumbnail_canvas.canvasy(0)
+        first = max(bisect.bisect_right(self.thumbnail_tops, view_top - self.canvas_height) - 1, 0)
+        last = min(bisect.bisect_right(self.thumbnail_tops, view_top + 2 * self.canvas_height), len(self.pdf_document))
+        wanted = range(first, last)
+        for page_index in [p for p in self.thumbnail_items if p not in wanted]:
+            self.thumbnail_canvas.delete(self.thumbnail_items.pop(page_index)[0])
+        for page_index in wanted:
+            if page_index in self.thumbnail_items:
+                continue
+            revision = self.engine.page_revision(page_index)
+            cached = self.thumbnail_png.get(page_index)
+            if cached is not None and cached[0] == revision:
+                self.show_thumbnail(page_index, cached[1])
+            elif revision == 0:
+                self.thumbnails.submit(page_index)
+            else:
+                self.schedule_thumbnail_refresh(page_index)
+        if self.thumbnails.pending and self.thumbnail_poll_id is None:
+            self.thumbnail_poll_id = self.root.after(50, self.collect_thumbnails)
+
+    def show_thumbnail(self, page_index, png):
+        image = tk.PhotoImage(data=png, format="png")
+        previous = self.thumbnail_items.pop(page_index, None)
+        if previous is not None:
+            self.thumbnail_canvas.delete(previous[0])
+        item = self.thumbnail_canvas.create_image(12, self.thumbnail_tops[page_index], anchor=tk.NW, image=image)
+        self.thumbnail_items[page_index] = (item, image)
+        self.thumbnail_canvas.tag_raise("thumb_current")
+
+    def collect_thumbnails(self):
+        self.thumbnail_poll_id = None
+        for page_index, png in self.thumbnails.pop_finished():
+            # The worker renders the file on disk, which is stale once the page is edited
+            if self.engine.page_revision(page_index) == 0:
+                self.thumbnail_png[page_index] = (0, png)
+                self.show_thumbnail(page_index, png)
+        if self.thumbnails.pending:
+            self.thumbnail_poll_id = self.root.after(50, self.collect_thumbnails)
+
+    def schedule_thumbnail_refresh(self, page_index):
+        self.stale_thumbnails.add(page_index)
+        if self.thumbnail_refresh_id is None:
+            self.thumbnail_refresh_id = self.root.after(300, self.refresh_stale_thumbnails)
+
+    @holds_engine_lock
+    def refresh_stale_thumbnails(self):
+        # Edited pages only exist in memory, so they are rendered here rather than on the worker
+        self.thumbnail_refresh_id = None
+        for page_index in sorted(self.stale_thumbnails):
+            png = render_thumbnail_png(self.engine.page(page_index), self.thumbnails.width)
+            self.thumbnail_png[page_index] = (self.engine.page_revision(page_index), png)
+            self.show_thumbnail(page_index, png)
+        self.stale_thumbnails.clear()
+
+    def highlight_current_thumbnail(self):
+        self.thumbnail_canvas.delete("thumb_current")
+        if not self.thumbnail_tops:
+            return
+        top = self.thumbnail_tops[self.current_page_index]
+        bottom = self.thumbnail_tops[self.current_page_index + 1] - 24
+        self.thumbnail_canvas.create_rectangle(
+            10, top - 2, 14 + self.thumbnails.width, bottom + 2, outline="royalblue", width=3, tag="thumb_current"
+        )
+        view_top = self.thumbnail_canvas.canvasy(0)
+        if top < view_top or bottom > view_top + self.canvas_height:
+            self.thumbnail_canvas.yview_moveto(max(top - 8, 0) / self.thumbnail_tops[-1])
+
+    def schedule_search_collection(self):
+        if self.search_poll_id is None:
+            self.search_poll_id = self.root.after(50, self.collect_search_index)
+
+    def collect_search_index(self):
+        # Finished pages are merged a bounded number at a time so a large cached index
+        # does not stall the Tk thread
+        self.search_poll_id = None
+        for pages in self.search_builder.pop_finished():
+            self.search_backlog.extend(pages.items())
+        merged = self.search_backlog[:self.search_merge_pages]
+        del self.search_backlog[:self.search_merge_pages]
+        for page_index, entries in merged:
+            self.engine.add_search_entries(page_index, entries)
+        if merged and self.search_query:
+            self.refresh_search()
+        self.update_search_label()
+        if self.search_builder.pending or self.search_backlog:
+            self.schedule_search_collection()
+
+    def refresh_search(self):
+        # Keeps the current hit selected when more pages become searchable
+        current = self.search_hits[self.search_hit_index] if self.search_hits else None
+        self.set_search_hits(self.search_query, self.engine.search(self.search_query, build=False))
+        if current is not None:
+            for index, hit in enumerate(self.search_hits):
+                if hit["page"] == current["page"] and hit["rect"] == current["rect"]:
+                    self.search_hit_index = index
+                    break
+
+    def find_next(self, step=1):
+        if not self.pdf_document:
+            return
+        query = self.search_entry.get().strip()
+        if query != self.search_query:
+            self.set_search_hits(query, self.engine.search(query, build=False) if query else [])
+            # Start from the first hit at or after the page being viewed
+            self.search_hit_index = bisect.bisect_left(self.search_hit_pages, self.current_page_index) % max(len(self.search_hits), 1)
+            if step < 0 and self.search_hits:
+                self.search_hit_index = (self.search_hit_index - 1) % len(self.search_hits)
+        elif self.search_hits:
+            self.search_hit_index = (self.search_hit_index + step) % len(self.search_hits)
+        self.update_search_label()
+        if self.search_hits:
+            self.show_search_hit(self.search_hits[self.search_hit_index])
+        else:
+            self.canvas.delete("search")
+
+    def replace_all_text(self):
+        if not self.pdf_document:
+            return
+        query = self.search_entry.get().strip()
+        replacement = self.replace_entry.get()
+        if not query:
+            messagebox.showwarning("Warning", "Enter the text to find first.")
+            return
+        try:
+            matches = self.engine.find_text(query)
+            if not matches:
+                messagebox.showinfo("Replace All", f"No matches for '{query}'.")
+                return
+            pages = {match["page"] for match in matches}
+            if not messagebox.askyesno("Replace All", f"Replace {len(matches)} matches on {len(pages)} pages?"):
+                return
+            counts, failed = self.engine.replace_all(query, replacement, matches=matches)
+        except Exception as e:
+            show_error("Error", f"Failed to replace text: {e}")
+            return
+        self.edits_applied(set(counts))
+        self.set_search_hits("", [])
+        self.update_search_label()
+        self.render_page()
+        message = f"Replaced {sum(counts.values())} matches on {len(counts)} pages."
+        if failed:
+            pages = ", ".join(str(page + 1) for page in sorted({match["page"] for match in failed}))
+            messagebox.showwarning("Replace All", f"{message}\n{len(failed)} matches could not be replaced (pages {pages}).")
+        else:
+            messagebox.showinfo("Success", message)
+
+    def set_search_hits(self, query, hits):
+        self.search_query = query
+        self.search_hits = hits
+        self.search_hit_pages = [hit["page"] for hit in hits]
+        self.search_hit_index = 0
+
+    def find_previous(self):
+        self.find_next(-1)
+
+    @holds_engine_lock
+    def show_search_hit(self, hit):
+        page_index, rect = hit["page"], hit["rect"]
+        self.current_page_index = page_index
+        self.selected_sentences = []
+        page = self.engine.page(page_index)
+        if self.continuous:
+            self.ensure_continuous_layout()
+            self.scroll_y = self.page_tops[page_index] + rect.y0 * self.continuous_scale - self.canvas_height / 3
+        else:
+            # Centre the hit; render_page clamps the view to the page
+            self.scale_factor = self.display_scale(page)
+            self.crop_x = (rect.x0 + rect.x1) / 2 - self.canvas_width / 2 / self.scale_factor
+            self.crop_y = (rect.y0 + rect.y1) / 2 - self.canvas_height / 2 / self.scale_factor
+        self.render_page()
+        self.update_navigation_buttons()
+
+    def highlight_search_hits(self):
+        self.canvas.delete("search")
+        if not self.search_hits:
+            return
+        current = self.search_hits[self.search_hit_index]
+        first = bisect.bisect_left(self.search_hit_pages, self.current_page_index)
+        last = bisect.bisect_right(self.search_hit_pages, self.current_page_index)
+        for hit in self.search_hits[first:last]:
+            if hit is current:
+                continue
+            x0, y0, x1, y1 = self.pdf_to_canvas_bbox(hit["rect"])
+            self.canvas.create_rectangle(x0, y0, x1, y1, outline="red", width=1, tag="search")
+        if current["page"] == self.current_page_index:
+            self.highlight_selected_sentence(current["rect"])
+
+    def update_search_label(self):
+        if not self.pdf_document:
+            return
+        indexed, total = len(self.engine.search_index), len(self.pdf_document)
+        if self.search_query:
+            text = f"{self.search_hit_index + 1} / {len(self.search_hits)}" if self.search_hits else "No hits"
+        else:
+            text = ""
+        if indexed < total:
+            text = f"{text} (indexing {indexed} / {total} pages)".strip()
+        self.search_label.config(text=text)
 
     def update_navigation_buttons(self):
+        self.highlight_current_thumbnail()
         if self.current_page_index == 0:
             self.prev_button.config(state=tk.DISABLED)
         else:
@@ -721,31 +2096,191 @@ class PDFEditor:
             if not messagebox.askyesno("Confirm Overwrite", "File already exists. Overwrite?"):
                 return
         try:
-            # Apply all drawings to PDF
-            for drawing in self.drawings:
-                if drawing["type"] == "stroke":
-                    page = self.pdf_document[self.current_page_index]
-                    pdf_width = page.mediabox.width
-                    pdf_height = page.mediabox.height
-                    differ_x = (self.canvas_width - pdf_width * self.scale_factor) / 2
-                    differ_y = (self.canvas_height - pdf_height * self.scale_factor) / 2
-
-                    points = drawing["points"]
-                    pdf_points = []
-                    for point in points:
-                        pdf_x = (point["x"] - differ_x) / self.scale_factor
-                        pdf_y = (point["y"] - differ_y) / self.scale_factor
-                        pdf_points.append(fitz.Point(pdf_x, pdf_y))
-
-                    if len(pdf_points) > 1:
-                        page.draw_path(pdf_points, color=tuple(c/255 for c in self.font_color), width=drawing["width"])
-
-            self.pdf_document.save(save_path)
+            self.flatten_drawings()
+            self.write_document(save_path)
             messagebox.showinfo("Success", "PDF saved successfully!")
         except fitz.FitzError as fe:
-            messagebox.showerror("Error", f"Failed to save PDF: {fe}")
+            show_error("Error", f"Failed to save PDF: {fe}")
         except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
+            show_error("Error", f"An unexpected error occurred: {e}")
+
+    def flatten_drawings(self):
+        # Apply the strokes of every page to the PDF; once flattened they are part of the page
+        operations = []
+        for page_index, page_strokes in self.strokes.items():
+            for drawing in page_strokes:
+                if drawing["type"] == "stroke":
+                    pdf_points = list(drawing["points"])
+                    color = tuple(int(drawing["color"][i:i + 2], 16) for i in (1, 3, 5))
+                    operations.append(AddInk(page_index, pdf_points, color=color, width=drawing["width"], smooth=self.smooth_strokes))
+        if operations:
+            self.apply_edits(*operations)
+        self.strokes = {}
+        self.undo_stack = [a for a in self.undo_stack if a["type"] not in ("stroke", "delete_stroke")]
+        self.redo_stack = [a for a in self.redo_stack if a["type"] not in ("stroke", "delete_stroke")]
+
+    def save_to_original(self, event=None):
+        if not self.pdf_document or not self.filepath:
+            return
+        if not self.engine.has_unsaved_changes and not any(self.strokes.values()):
+            return
+        try:
+            self.flatten_drawings()
+            self.write_document(self.filepath)
+            messagebox.showinfo("Success", "PDF saved successfully!")
+        except Exception as e:
+            show_error("Error", f"Failed to save PDF: {e}")
+
+    def write_document(self, save_path):
+        if self.autosave_future is not None:
+            # Once it is done the document is not used off the Tk thread; a failed autosave does
+            # not matter once the document itself is saved
+            wait([self.autosave_future])
+            self.autosave_future = None
+        replaces_opened = os.path.exists(save_path) and os.path.samefile(save_path, self.filepath)
+        # Only pages changed since the opened file was last written need new thumbnails
+        changed = [
+            page_index for page_index, revision in self.engine.page_revisions.items()
+            if revision != self.saved_revisions.get(page_index, 0)
+        ]
+        self.engine.save(save_path)
+        # Saving over the opened file without appending reopens the document
+        self.pdf_document = self.engine.document
+        self.thumbnails.publish(save_path, changed, replaces_opened)
+        if replaces_opened:
+            self.saved_revisions = dict(self.engine.page_revisions)
+        # The saved file's word lists are only written once every page is indexed
+        self.engine.update_search_index(self.engine.indexed_revisions)
+        if len(self.engine.search_index) == len(self.pdf_document):
+            self.search_builder.publish(save_path, self.engine.search_index.pages)
+        self.autosaved_generation = self.engine.edit_generation
+        autosave_path = self.autosave_path()
+        if autosave_path and os.path.exists(autosave_path):
+            os.remove(autosave_path)
+
+    def autosave_path(self):
+        if not self.filepath:
+            return None
+        return os.path.splitext(self.filepath)[0] + ".autosave.pdf"
+
+    def autosave(self):
+        self.root.after(self.autosave_interval_ms, self.autosave)
+        if self.autosave_future is not None:
+            if not self.autosave_future.done():
+                return
+            self.report_autosave(self.autosave_future)
+        if not self.engine or not self.engine.has_unsaved_changes or self.engine.edit_generation == self.autosaved_generation:
+            return
+        # Serializing takes time in proportion to the file size, so the worker does it, holding the
+        # engine lock; the Tk thread only waits for it when it needs the document meanwhile
+        self.autosaved_generation = self.engine.edit_generation
+        self.autosave_future = self.autosave_executor.submit(self.write_autosave, self.engine, self.autosave_path())
+
+    def report_autosave(self, future):
+        self.autosave_future = None
+        error = future.exception()
+        if error is None:
+            self.autosave_label.config(text="")
+            return
+        # Written again right away
+        self.autosaved_generation = None
+        PROFILER.error(f"Autosave failed: {error}")
+        self.autosave_label.config(text="Autosave failed")
+
+    def toggle_stats_overlay(self):
+        if self.stats_overlay is not None:
+            self.stats_overlay.destroy()
+            self.stats_overlay = None
+            if self.stats_poll_id is not None:
+                self.root.after_cancel(self.stats_poll_id)
+                self.stats_poll_id = None
+            return
+        PROFILER.enable()
+        self.stats_overlay = tk.Label(
+            self.canvas_frame, justify=tk.LEFT, anchor=tk.NW, font=("Courier", 9), bg="black", fg="white"
+        )
+        self.stats_overlay.place(x=8, y=8)
+        self.update_stats_overlay()
+
+    def update_stats_overlay(self):
+        self.stats_poll_id = None
+        if self.stats_overlay is None:
+            return
+
+        def ms(name):
+            value = PROFILER.last_ms(name)
+            return "-" if value is None else f"{value:.1f} ms"
+
+        lookups = self.page_cache.hits + self.page_cache.misses
+        hit_rate = f"{100 * self.page_cache.hits / lookups:.0f}%" if lookups else "-"
+        rss = resident_memory()
+        lines = [
+            f"render     {ms('render_page')}",
+            f"pixmap     {ms('get_pixmap')}",
+            f"sentences  {ms('extract_sentences')}",
+            f"fields     {ms('extract_form_fields')}",
+            f"cache      {hit_rate} of {lookups}, {self.page_cache.current_bytes / (1024 * 1024):.0f} MB",
+            f"items      {len(self.canvas.find_all())}",
+        ]
+        if rss is not None:
+            lines.append(f"memory     {rss / (1024 * 1024):.0f} MB")
+        if PROFILER.errors:
+            lines.append(f"error      {PROFILER.errors[-1][1][:60]}")
+        self.stats_overlay.config(text="\n".join(lines))
+        self.stats_poll_id = self.root.after(500, self.update_stats_overlay)
+
+    def export_trace(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Chrome trace", "*.trace.json"), ("Timing summary", "*.json")],
+        )
+        if not path:
+            return
+        try:
+            if path.endswith(".trace.json"):
+                PROFILER.export_chrome_trace(path)
+            else:
+                PROFILER.export_json(path)
+        except OSError as e:
+            show_error("Error", f"Failed to export trace: {e}")
+            return
+        messagebox.showinfo("Success", f"Trace written to {path}.")
+
+    def monitor_memory(self):
+        self.root.after(self.memory_poll_ms, self.monitor_memory)
+        rss = self.enforce_memory_limit()
+        if rss is None:
+            return
+        text = f"Memory: {rss / (1024 * 1024):.0f} MB"
+        if self.memory_limit:
+            text += f" / {self.memory_limit / (1024 * 1024):.0f} MB"
+        self.memory_label.config(text=text)
+
+    def enforce_memory_limit(self):
+        # Cheap enough to run after every render, which is where memory grows. When a trim cannot
+        # get below the limit, trimming again right away would only keep emptying the caches.
+        rss = resident_memory()
+        if rss is None or not self.memory_limit or rss <= self.memory_limit or not self.engine:
+            return rss
+        now = time.monotonic()
+        if self.last_memory_trim is not None and now - self.last_memory_trim < self.memory_trim_interval_s:
+            return rss
+        self.last_memory_trim = now
+        self.trim_memory()
+        return resident_memory() or rss
+
+    def trim_memory(self):
+        # Everything dropped here can be rebuilt: images are re-rendered, pages reloaded,
+        # and thumbnails of unedited pages are read back from the disk cache
+        self.page_cache.clear()
+        self.thumbnail_png = {p: entry for p, entry in self.thumbnail_png.items() if entry[0]}
+        self.engine.trim_memory()
+
+    @staticmethod
+    def write_autosave(engine, path):
+        temp_path = path + ".tmp"
+        engine.write_snapshot(temp_path)
+        os.replace(temp_path, path)
 
     def start_drag(self, event):
         if not self.selected_text:
@@ -753,19 +2288,29 @@ class PDFEditor:
         self.dragging = True
         self.drag_start_x = event.x
         self.drag_start_y = event.y
+        self.drag_offset_x = 0
+        self.drag_offset_y = 0
 
         if self.selected_text["type"] == "stroke":
             stroke_data = self.selected_text["stroke_data"]
             self.moving_content = {
                 "type": "stroke",
-                "original_points": [p.copy() for p in stroke_data["points"]],
                 "stroke_data": stroke_data
             }
+            x0, y0, x1, y1 = self.pdf_to_canvas_bbox(stroke_data["bbox"])
         else:
             self.moving_content = self.selected_text.copy()
             rect = self.selected_text["rect"]
             self.content_start_x = rect.x0
             self.content_start_y = rect.y0
+            x0 = (rect.x0 - self.crop_x) * self.scale_factor
+            y0 = (rect.y0 - self.crop_y) * self.scale_factor
+            x1 = (rect.x1 - self.crop_x) * self.scale_factor
+            y1 = (rect.y1 - self.crop_y) * self.scale_factor
+
+        # Dragging only moves canvas items; the PDF is changed once in end_drag
+        self.canvas.delete("dragging")
+        self.canvas.create_rectangle(x0, y0, x1, y1, outline="orange", width=2, dash=(2, 2), tag="dragging")
 
     def do_drag(self, event):
         if not self.dragging or not self.selected_text:
@@ -775,18 +2320,15 @@ class PDFEditor:
 
         self.drag_start_x = event.x
         self.drag_start_y = event.y
+        self.drag_offset_x += dx
+        self.drag_offset_y += dy
 
+        self.canvas.move("dragging", dx, dy)
+        self.canvas.move("highlight", dx, dy)
         if self.selected_text["type"] == "stroke":
-            stroke = self.moving_content["stroke_data"]
-            original_points = self.moving_content["original_points"]
-            for i, op in enumerate(original_points):
-                stroke["points"][i]["x"] = op["x"] + dx
-                stroke["points"][i]["y"] = op["y"] + dy
-            xs = [p["x"] for p in stroke["points"]]
-            ys = [p["y"] for p in stroke["points"]]
-            stroke["bbox"] = (min(xs), min(ys), max(xs), max(ys))
-            self.selected_text["rect"] = fitz.Rect(*stroke["bbox"])
-            self.render_page()
+            canvas_item = self.moving_content["stroke_data"].get("canvas_item")
+            if canvas_item:
+                self.canvas.move(canvas_item, dx, dy)
         else:
             rect = self.moving_content["rect"]
             new_rect = fitz.Rect(
@@ -796,19 +2338,25 @@ class PDFEditor:
                 rect.y1 + dy / self.scale_factor
             )
             self.moving_content["rect"] = new_rect
-            self.render_page()
 
     def end_drag(self, event):
         if not self.dragging or not self.selected_text:
             return
         self.dragging = False
         self.canvas.delete("dragging")
+        moved = self.drag_offset_x != 0 or self.drag_offset_y != 0
 
-        self.selected_text["page"] = self.pdf_document[self.current_page_index]
-        self.extract_form_fields()
+        self.selected_text["page_index"] = self.current_page_index
 
-        if self.selected_text["type"] == "stroke":
-            pass
+        if not moved:
+            self.canvas.delete("highlight")
+        elif self.selected_text["type"] == "stroke":
+            stroke = self.moving_content["stroke_data"]
+            dx = self.drag_offset_x / self.scale_factor
+            dy = self.drag_offset_y / self.scale_factor
+            stroke["points"].translate(dx, dy)
+            stroke["bbox"] = stroke["points"].bbox()
+            self.render_page()
         elif self.selected_text["type"] == "text":
             final_rect = self.moving_content["rect"]
             new_x0 = final_rect.x0
@@ -816,42 +2364,21 @@ class PDFEditor:
             new_x1 = final_rect.x1
             new_y1 = final_rect.y1
 
-            old_rect = self.selected_text["rect"]
             try:
-                self.selected_text["page"].add_redact_annot(old_rect, fill=(1, 1, 1))
-                self.selected_text["page"].apply_redactions()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to erase original text: {e}")
-                self.canvas.bind("<ButtonPress-1>", self.on_button_press)
-                self.moving_content = None
-                return
-
-            new_text = self.selected_text["sentence"]
-            font_family = self.selected_text["font_family"]
-            font_mapping = {
-                "helvetica": "helv",
-                "times": "times",
-                "courier": "courier",
-                "arial": "helv",
-                "symbol": "symbol",
-            }
-            fitz_font_name = font_mapping.get(font_family.lower(), "helv")
-            font_color_normalized = tuple(c/255 for c in self.font_color)
-
-            insertion_point = (new_x0, new_y0 + self.font_size)
-            try:
-                self.selected_text["page"].insert_text(
-                    insertion_point,
-                    new_text,
-                    fontsize=self.font_size,
-                    fontname=fitz_font_name,
-                    color=font_color_normalized,
-                )
+                self.apply_edits(MoveText(
+                    self.current_page_index,
+                    self.selected_text["rect"],
+                    final_rect,
+                    self.selected_text["sentence"],
+                    font_size=self.font_size,
+                    font_family=self.selected_text["font_family"],
+                    color=self.font_color,
+                ))
                 self.selected_text["rect"] = fitz.Rect(new_x0, new_y0, new_x1, new_y1)
                 self.render_page()
                 messagebox.showinfo("Success", "Text moved successfully!")
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to insert text at new location: {e}")
+                show_error("Error", f"Failed to move text: {e}")
 
         elif self.selected_text["type"] == "form_field":
             final_rect = self.moving_content["rect"]
@@ -860,27 +2387,23 @@ class PDFEditor:
             new_x1 = final_rect.x1
             new_y1 = final_rect.y1
 
-            fields = self.form_fields.get(self.current_page_index, [])
-            widget = None
-            for fw in fields:
-                if fw["field_name"] == self.selected_text["field_name"]:
-                    widget = fw["widget"]
-                    break
-
-            if not widget:
-                messagebox.showerror("Error", "Failed to move form field: Widget not found or invalid.")
+            if self.engine.field_index.get(self.selected_text["field_name"], self.current_page_index) is None:
+                show_error("Error", "Failed to move form field: Widget not found or invalid.")
                 self.canvas.bind("<ButtonPress-1>", self.on_button_press)
                 self.moving_content = None
                 return
 
             try:
-                widget.rect = fitz.Rect(new_x0, new_y0, new_x1, new_y1)
-                widget.update()
-                self.selected_text["rect"] = widget.rect
+                self.apply_edits(MoveField(
+                    self.selected_text["field_name"],
+                    (new_x0, new_y0, new_x1, new_y1),
+                    page=self.current_page_index,
+                ))
+                self.selected_text["rect"] = fitz.Rect(new_x0, new_y0, new_x1, new_y1)
                 self.render_page()
                 messagebox.showinfo("Success", "Form field moved successfully!")
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to move form field: {e}")
+                show_error("Error", f"Failed to move form field: {e}")
 
         self.canvas.unbind("<ButtonPress-1>")
         self.canvas.unbind("<B1-Motion>")
@@ -895,19 +2418,15 @@ class PDFEditor:
             messagebox.showwarning("Warning", "Please upload a PDF before editing.")
             return
 
+        self.activate_page_at(event.y)
         x_canvas = event.x
         y_canvas = event.y
-        pdf_x = (x_canvas + self.crop_x) / self.scale_factor
-        pdf_y = (y_canvas + self.crop_y) / self.scale_factor
+        pdf_x = x_canvas / self.scale_factor + self.crop_x
+        pdf_y = y_canvas / self.scale_factor + self.crop_y
 
         # Check form fields first
-        form_fields = self.form_fields.get(self.current_page_index, [])
-        selected_field = None
-        for field in form_fields:
-            rect = field["rect"]
-            if rect.contains(fitz.Point(pdf_x, pdf_y)):
-                selected_field = field
-                break
+        hits = self.spatial_index.query_point(pdf_x, pdf_y, "form_field")
+        selected_field = hits[0] if hits else None
 
         if selected_field:
             if selected_field["field_type"] == "checkbox":
@@ -922,8 +2441,7 @@ class PDFEditor:
                 "type": "form_field",
                 "field_name": selected_field["field_name"],
                 "rect": selected_field["rect"],
-                "widget": selected_field["widget"],
-                "page": self.pdf_document[self.current_page_index],
+                "page_index": self.current_page_index,
                 "font_size": self.font_size,
                 "font_family": self.font_family_var.get()
             }
@@ -936,7 +2454,7 @@ class PDFEditor:
                 editor_y = self.canvas_height - 50
 
             self.entry_widget.config(font=(self.font_family_var.get(), self.font_size))
-            current_value = selected_field["widget"].field_value or ""
+            current_value = selected_field["value"] or ""
             self.entry_widget.delete(0, tk.END)
             self.entry_widget.insert(0, current_value.strip())
 
@@ -952,19 +2470,15 @@ class PDFEditor:
             return
 
         # Check text
-        selected_sentence = None
-        for sentence in self.sentences:
-            rect = sentence["rect"]
-            if rect.contains(fitz.Point(pdf_x, pdf_y)):
-                selected_sentence = sentence
-                break
+        hits = self.spatial_index.query_point(pdf_x, pdf_y, "text")
+        selected_sentence = hits[0] if hits else None
 
         if selected_sentence:
             self.selected_text = {
                 "type": "text",
                 "sentence": selected_sentence["text"],
                 "rect": selected_sentence["rect"],
-                "page": self.pdf_document[self.current_page_index],
+                "page_index": self.current_page_index,
                 "font_size": self.font_size,
                 "font_family": self.font_family_var.get()
             }
@@ -992,13 +2506,9 @@ class PDFEditor:
             return
 
         # If no text or form field selected, check strokes
-        clicked_stroke = None
-        for d in reversed(self.drawings):
-            if d["type"] == "stroke":
-                x0, y0, x1, y1 = d["bbox"]
-                if x0 <= x_canvas <= x1 and y0 <= y_canvas <= y1:
-                    clicked_stroke = d
-                    break
+        # The most recently drawn stroke is on top
+        hits = self.spatial_index.query_point(pdf_x, pdf_y, "stroke")
+        clicked_stroke = hits[-1] if hits else None
 
         if clicked_stroke:
             self.selected_text = {
@@ -1017,23 +2527,15 @@ class PDFEditor:
 
     def check_checkbox(self, field_name):
         try:
-            page = self.pdf_document[self.current_page_index]
-            widgets = page.widgets()
-            if widgets:
-                for w in widgets:
-                    if w.field_name == field_name:
-                        if w.field_type == "Btn" and getattr(w, 'field_flag_checkbox', False):
-                            export_value = w.export_value if w.export_value else "Yes"
-                            w.field_value = export_value
-                            w.update()
-                            self.render_page()
-                            messagebox.showinfo("Success", f"Checkbox '{field_name}' checked successfully!")
-                            return
-                messagebox.showwarning("Warning", f"Checkbox '{field_name}' not found on this page.")
-            else:
-                messagebox.showwarning("Warning", "No form fields found on this page.")
+            field = self.engine.field_index.get(field_name, self.current_page_index)
+            if field and field["field_type"] == "checkbox":
+                self.apply_edits(FillField(field_name, True, page=self.current_page_index))
+                self.render_page()
+                messagebox.showinfo("Success", f"Checkbox '{field_name}' checked successfully!")
+                return
+            messagebox.showwarning("Warning", f"Checkbox '{field_name}' not found on this page.")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to check checkbox '{field_name}': {e}")
+            show_error("Error", f"Failed to check checkbox '{field_name}': {e}")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,1444 @@
+"""GUI-free document and edit engine used by the Tk editor.
+
+Only depends on PyMuPDF so it can be imported by scripts and batch workers
+without pulling in tkinter or PIL.
+"""
+import bisect
+import contextlib
+import functools
+import gc
+import mmap
+import os
+import re
+import sys
+import threading
+import traceback
+from array import array
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional, Sequence, Tuple
+
+import fitz
+
+from instrumentation import PROFILER
+
+
+# PyMuPDF's base-14 font names
+FONT_MAPPING = {
+    "helvetica": "helv",
+    "times": "tiro",
+    "courier": "cour",
+    "arial": "helv",
+    "symbol": "symb",
+}
+
+
+def fitz_font_name(font_family):
+    return FONT_MAPPING.get(font_family.lower(), "helv")
+
+
+def normalize_color(color):
+    # The editor keeps colours as 0-255 RGB, PyMuPDF expects 0-1 floats
+    return tuple(c / 255 for c in color)
+
+
+class EngineError(Exception):
+    pass
+
+
+@dataclass
+class ReplaceText:
+    page: int
+    rect: Tuple[float, float, float, float]
+    text: str
+    font_size: float = 12
+    font_family: str = "Helvetica"
+    color: Tuple[int, int, int] = (0, 0, 0)
+    baseline: Optional[float] = None  # y of the text baseline; estimated from rect when unknown
+
+
+@dataclass
+class InsertText:
+    page: int
+    point: Tuple[float, float]
+    text: str
+    font_size: float = 12
+    font_family: str = "Helvetica"
+    color: Tuple[int, int, int] = (0, 0, 0)
+
+
+@dataclass
+class MoveText:
+    page: int
+    rect: Tuple[float, float, float, float]
+    new_rect: Tuple[float, float, float, float]
+    text: str
+    font_size: float = 12
+    font_family: str = "Helvetica"
+    color: Tuple[int, int, int] = (0, 0, 0)
+
+
+@dataclass
+class DeleteText:
+    page: int
+    rect: Tuple[float, float, float, float]
+
+
+@dataclass
+class FillField:
+    field_name: str
+    value: object
+    page: Optional[int] = None
+
+
+@dataclass
+class MoveField:
+    field_name: str
+    new_rect: Tuple[float, float, float, float]
+    page: Optional[int] = None
+
+
+@dataclass
+class DeleteField:
+    field_name: str
+    page: Optional[int] = None
+
+
+@dataclass
+class AddInk:
+    page: int
+    points: Sequence[Tuple[float, float]]
+    color: Tuple[int, int, int] = (0, 0, 0)
+    width: float = 2
+    smooth: bool = False
+
+
+TEXT_OPERATIONS = (ReplaceText, InsertText, MoveText, DeleteText)
+
+
+def calculate_sentence_rect(words):
+    try:
+        x0 = min(w[0] for w in words) - 2
+        y0 = min(w[1] for w in words) - 2
+        x1 = max(w[2] for w in words) + 2
+        y1 = max(w[3] for w in words) + 2
+        return fitz.Rect(x0, y0, x1, y1)
+    except Exception:
+        return fitz.Rect(0, 0, 0, 0)
+
+
+def extract_sentences(page):
+    words = page.get_text("words")
+    words.sort(key=lambda w: (w[1], w[0]))
+
+    sentences = []
+    current_sentence = []
+    current_sentence_words = []
+    current_block_no = None
+    current_line_no = None
+
+    for word in words:
+        x0, y0, x1, y1, text, block_no, line_no, word_no = word
+        if current_sentence and (block_no != current_block_no or line_no != current_line_no):
+            if current_sentence:
+                sentence_text = ' '.join(current_sentence)
+                sentences.append({
+                    "text": sentence_text,
+                    "words": current_sentence_words.copy(),
+                    "rect": calculate_sentence_rect(current_sentence_words)
+                })
+                current_sentence = []
+                current_sentence_words = []
+        if not current_sentence:
+            current_sentence_words = []
+        current_sentence.append(text)
+        current_sentence_words.append(word)
+        if text.endswith(('.', '!', '?')):
+            sentence_text = ' '.join(current_sentence)
+            sentences.append({
+                "text": sentence_text,
+                "words": current_sentence_words.copy(),
+                "rect": calculate_sentence_rect(current_sentence_words)
+            })
+            current_sentence = []
+            current_sentence_words = []
+        current_block_no = block_no
+        current_line_no = line_no
+
+    if current_sentence:
+        sentence_text = ' '.join(current_sentence)
+        sentences.append({
+            "text": sentence_text,
+            "words": current_sentence_words.copy(),
+            "rect": calculate_sentence_rect(current_sentence_words)
+        })
+    return sentences
+
+
+def span_font_family(font_name):
+    name = font_name.lower()
+    for family in ("Times", "Courier", "Symbol"):
+        if family.lower() in name:
+            return family
+    return "Helvetica"
+
+
+def find_text(page, query):
+    """Matches of query on a page, each with the style of the span it sits in.
+
+    Returns dicts with page, rect, font_size, font_family, color (0-255 RGB)
+    and baseline, ready to be turned into ReplaceText operations.
+    """
+    rects = page.search_for(query)
+    if not rects:
+        return []
+    spans = SpatialIndex()
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                spans.insert("span", span, span["bbox"])
+    matches = []
+    for rect in rects:
+        candidates = spans.query_rect(*rect)
+        if candidates:
+            span = max(candidates, key=lambda s: abs(fitz.Rect(s["bbox"]) & rect))
+            color = span["color"]
+            style = {
+                "font_size": span["size"],
+                "font_family": span_font_family(span["font"]),
+                "color": ((color >> 16) & 255, (color >> 8) & 255, color & 255),
+                "baseline": span["origin"][1],
+            }
+        else:
+            style = {"font_size": rect.height * 0.8, "font_family": "Helvetica", "color": (0, 0, 0), "baseline": None}
+        matches.append({"page": page.number, "rect": rect, **style})
+    return matches
+
+
+def extract_form_fields(page):
+    # Values are read here because widgets lose their page once it is released
+    form_fields = []
+    for widget in page.widgets() or []:
+        checkbox = is_checkbox(widget)
+        form_fields.append({
+            "field_name": widget.field_name,
+            "field_type": "checkbox" if checkbox else widget.field_type,
+            "rect": widget.rect,
+            "value": widget.field_value,
+            "export_value": checkbox_export_value(widget) if checkbox else None,
+        })
+    return form_fields
+
+
+def stroke_path(points, smooth=False):
+    """PDF path operators for a stroke through points given in content-stream coordinates.
+
+    With smooth, a Catmull-Rom spline through the points is written as one cubic
+    Bezier per segment. That makes the path about three times longer than the
+    polyline, and is why strokes are simplified before they are smoothed.
+    """
+    lines = ["%g %g m" % points[0]]
+    if not smooth or len(points) < 3:
+        lines.extend("%g %g l" % point for point in points[1:])
+        return "\n".join(lines) + "\n"
+    last = len(points) - 1
+    for i in range(last):
+        x0, y0 = points[max(i - 1, 0)]
+        x1, y1 = points[i]
+        x2, y2 = points[i + 1]
+        x3, y3 = points[min(i + 2, last)]
+        lines.append("%g %g %g %g %g %g c" % (
+            x1 + (x2 - x0) / 6, y1 + (y2 - y0) / 6, x2 - (x3 - x1) / 6, y2 - (y3 - y1) / 6, x2, y2,
+        ))
+    return "\n".join(lines) + "\n"
+
+
+def flatten_strokes(page, strokes):
+    """Draw (points, color, width, smooth) strokes into a page; returns how many were drawn.
+
+    All strokes share one Shape, so a page gets a single new content stream. The
+    path operators are written directly: Shape.draw_bezier builds and
+    transforms a Point per control point, which made smoothed strokes slow.
+    """
+    shape = page.new_shape()
+    a, b, c, d, e, f = shape.ipctm
+    drawn = 0
+    for points, color, width, smooth in strokes:
+        if len(points) < 2:
+            continue
+        shape.draw_cont += stroke_path([(a * x + c * y + e, b * x + d * y + f) for x, y in points], smooth)
+        shape.finish(color=normalize_color(color), width=width, closePath=False)
+        drawn += 1
+    if drawn:
+        shape.commit()
+    return drawn
+
+
+def flatten_stroke(page, points, color=(0, 0, 0), width=2, smooth=False):
+    return flatten_strokes(page, [(points, color, width, smooth)]) > 0
+
+
+class StrokePoints:
+    """Ink stroke coordinates packed as interleaved x/y pairs in a float32 buffer.
+
+    Transforms rewrite the x and y slices in one pass each instead of touching
+    a Python object per point, and the bounding box is cached between them.
+    """
+
+    def __init__(self, coords=()):
+        self.coords = array("f", coords)
+        self._bbox = None
+
+    def __len__(self):
+        return len(self.coords) // 2
+
+    def __iter__(self):
+        return zip(self.coords[0::2], self.coords[1::2])
+
+    @property
+    def nbytes(self):
+        return len(self.coords) * self.coords.itemsize
+
+    def append(self, x, y):
+        self.coords.extend((x, y))
+        if self._bbox is not None:
+            x0, y0, x1, y1 = self._bbox
+            self._bbox = (min(x0, x), min(y0, y), max(x1, x), max(y1, y))
+
+    def last(self, count=1):
+        # Flat [x, y, ...] of the most recent points, e.g. for the live segment
+        return self.coords[-2 * count:].tolist()
+
+    def bbox(self):
+        if self._bbox is None and self.coords:
+            xs = self.coords[0::2]
+            ys = self.coords[1::2]
+            self._bbox = (min(xs), min(ys), max(xs), max(ys))
+        return self._bbox
+
+    def projected(self, scale, dx=0.0, dy=0.0):
+        # x * scale + dx for every point, as a new buffer ready to unpack into create_line
+        out = array("f", self.coords)
+        scale = float(scale)
+        out[0::2] = array("f", map(float(dx).__add__, map(scale.__mul__, out[0::2])))
+        out[1::2] = array("f", map(float(dy).__add__, map(scale.__mul__, out[1::2])))
+        return out
+
+    def transform(self, scale, dx=0.0, dy=0.0):
+        self.coords = self.projected(scale, dx, dy)
+        self._bbox = None
+
+    def translate(self, dx, dy):
+        bbox = self._bbox
+        self.transform(1.0, dx, dy)
+        if bbox is not None:
+            self._bbox = (bbox[0] + dx, bbox[1] + dy, bbox[2] + dx, bbox[3] + dy)
+
+    def scale(self, factor):
+        self.transform(factor)
+
+    def simplified(self, tolerance):
+        # Ramer-Douglas-Peucker; points closer than `tolerance` to the chord are dropped
+        count = len(self)
+        if tolerance <= 0 or count < 3:
+            return StrokePoints(self.coords)
+        xs = self.coords[0::2]
+        ys = self.coords[1::2]
+        keep = bytearray(count)
+        keep[0] = keep[-1] = 1
+        limit = tolerance * tolerance
+        stack = [(0, count - 1)]
+        while stack:
+            first, last = stack.pop()
+            ax, ay = xs[first], ys[first]
+            dx, dy = xs[last] - ax, ys[last] - ay
+            chord = dx * dx + dy * dy
+            farthest, index = 0.0, -1
+            for i in range(first + 1, last):
+                px, py = xs[i] - ax, ys[i] - ay
+                if chord:
+                    cross = px * dy - py * dx
+                    distance = cross * cross / chord
+                else:
+                    distance = px * px + py * py
+                if distance > farthest:
+                    farthest, index = distance, i
+            if farthest > limit:
+                keep[index] = 1
+                stack.append((first, index))
+                stack.append((index, last))
+        coords = array("f")
+        for i in range(count):
+            if keep[i]:
+                coords.extend((xs[i], ys[i]))
+        return StrokePoints(coords)
+
+
+def is_checkbox(widget):
+    if widget.field_type == getattr(fitz, "PDF_WIDGET_TYPE_CHECKBOX", None):
+        return True
+    return widget.field_type == "Btn" and getattr(widget, 'field_flag_checkbox', False)
+
+
+def checkbox_export_value(widget):
+    # Older PyMuPDF exposes export_value, newer releases only the "on" appearance state
+    export_value = getattr(widget, "export_value", None)
+    if not export_value and hasattr(widget, "on_state"):
+        export_value = widget.on_state()
+    return export_value if isinstance(export_value, str) and export_value else "Yes"
+
+
+def set_widget_value(widget, value):
+    # Checkboxes take any truthy value as checked, like clicking them in the editor
+    if is_checkbox(widget):
+        checked = value is not None and str(value).strip().lower() not in ("", "off", "0", "false", "no")
+        widget.field_value = checkbox_export_value(widget) if checked else "Off"
+    else:
+        widget.field_value = "" if value is None else str(value)
+    widget.update()
+
+
+class FormFieldIndex:
+    """Document-wide map of field name -> page, xref, type, rect and value.
+
+    Built lazily on first lookup and kept in sync through refresh() and
+    remove() so callers never have to rescan page.widgets().
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.fields = None
+
+    def copy_for(self, document):
+        # Valid for documents opened from the same bytes, where every xref matches
+        self._ensure_built()
+        index = FormFieldIndex(document)
+        index.fields = {name: [dict(e) for e in entries] for name, entries in self.fields.items()}
+        return index
+
+    @staticmethod
+    def describe(page_index, widget):
+        return {
+            "field_name": widget.field_name,
+            "page": page_index,
+            "xref": widget.xref,
+            "field_type": "checkbox" if is_checkbox(widget) else widget.field_type,
+            "rect": fitz.Rect(widget.rect),
+            "value": widget.field_value,
+        }
+
+    def _ensure_built(self):
+        if self.fields is not None:
+            return
+        self.fields = {}
+        for page in self.document:
+            for widget in page.widgets() or []:
+                self.fields.setdefault(widget.field_name, []).append(self.describe(page.number, widget))
+
+    def invalidate(self):
+        self.fields = None
+
+    def get(self, field_name, page_index=None):
+        self._ensure_built()
+        for entry in self.fields.get(field_name, []):
+            if page_index is None or entry["page"] == page_index:
+                return entry
+        return None
+
+    def list_fields(self):
+        self._ensure_built()
+        return [dict(entry) for entries in self.fields.values() for entry in entries]
+
+    def load_widget(self, field_name, page_index=None):
+        entry = self.get(field_name, page_index)
+        if entry is None:
+            return None, None
+        page = self.document[entry["page"]]
+        return page, page.load_widget(entry["xref"])
+
+    def refresh(self, page_index, widget):
+        self._ensure_built()
+        entries = self.fields.setdefault(widget.field_name, [])
+        updated = self.describe(page_index, widget)
+        for i, entry in enumerate(entries):
+            if entry["xref"] == widget.xref:
+                entries[i] = updated
+                return
+        entries.append(updated)
+
+    def remove(self, field_name, xref):
+        self._ensure_built()
+        entries = [e for e in self.fields.get(field_name, []) if e["xref"] != xref]
+        if entries:
+            self.fields[field_name] = entries
+        else:
+            self.fields.pop(field_name, None)
+
+    def fill(self, values):
+        """Set fields by name; checkboxes take any truthy value as checked.
+
+        Returns the set of page indices that were changed.
+        """
+        self._ensure_built()
+        touched = set()
+        for field_name, value in values.items():
+            for entry in list(self.fields.get(field_name, [])):
+                page = self.document[entry["page"]]
+                widget = page.load_widget(entry["xref"])
+                set_widget_value(widget, value)
+                self.refresh(entry["page"], widget)
+                touched.add(entry["page"])
+        return touched
+
+
+XREF_REFERENCE = re.compile(r"(\d+) 0 R")
+
+
+class PageSnapshot:
+    """Page object, content streams and indirect resources, enough to restore a page.
+
+    With annotations=True it also keeps the page's annotation objects, their
+    appearance streams and the AcroForm dictionary, which is what form edits
+    change.
+    """
+
+    def __init__(self, document, page_index, annotations=False):
+        page = document[page_index]
+        self.page_index = page_index
+        self.annotations = annotations
+        self.objects = {page.xref: document.xref_object(page.xref, compressed=True)}
+        kind, value = document.xref_get_key(page.xref, "Resources")
+        if kind == "xref":
+            resources_xref = int(value.split()[0])
+            self.objects[resources_xref] = document.xref_object(resources_xref, compressed=True)
+        self.streams = {xref: document.xref_stream(xref) for xref in page.get_contents()}
+        if annotations:
+            self._add_annotations(document, page.xref)
+
+    def _add_object(self, document, xref):
+        if xref in self.objects:
+            return
+        self.objects[xref] = document.xref_object(xref, compressed=True)
+        if document.xref_is_stream(xref):
+            self.streams[xref] = document.xref_stream(xref)
+
+    def _add_annotations(self, document, page_xref):
+        kind, value = document.xref_get_key(page_xref, "Annots")
+        if kind == "xref":
+            annots_xref = int(value.split()[0])
+            self._add_object(document, annots_xref)
+            value = document.xref_object(annots_xref)
+        for annot_xref in map(int, XREF_REFERENCE.findall(value)):
+            self._add_object(document, annot_xref)
+            for key in ("AP/N", "AP/D"):
+                for stream_xref in map(int, XREF_REFERENCE.findall(document.xref_get_key(annot_xref, key)[1])):
+                    self._add_object(document, stream_xref)
+        kind, value = document.xref_get_key(document.pdf_catalog(), "AcroForm")
+        if kind == "xref":
+            self._add_object(document, int(value.split()[0]))
+            kind, value = document.xref_get_key(document.pdf_catalog(), "AcroForm/Fields")
+        else:
+            self._add_object(document, document.pdf_catalog())
+        if kind == "xref":
+            self._add_object(document, int(value.split()[0]))
+
+    @property
+    def nbytes(self):
+        return sum(len(s) for s in self.objects.values()) + sum(len(s or b"") for s in self.streams.values())
+
+    def restore(self, document):
+        for xref, source in self.objects.items():
+            document.update_object(xref, source)
+        for xref, stream in self.streams.items():
+            if stream is not None:
+                document.update_stream(xref, stream)
+        # A loaded page keeps its own page dictionary and annotation list, so reload it
+        try:
+            document.reload_page(document[self.page_index])
+            return
+        except AssertionError:
+            # The page is still referenced, usually from a widget-page cycle awaiting collection.
+            # The retry happens outside this block, as the handled traceback holds the page too.
+            pass
+        # If the page is referenced for real, the reload fails and the error reaches the caller
+        gc.collect()
+        document.reload_page(document[self.page_index])
+
+
+@dataclass
+class HistoryEntry:
+    label: str
+    before: list = field(default_factory=list)
+    after: list = field(default_factory=list)
+
+    @property
+    def nbytes(self):
+        return sum(snapshot.nbytes for snapshot in self.before + self.after)
+
+
+class EditHistory:
+    """Undo and redo stacks of page snapshots taken around each edit.
+
+    Entries only hold the pages an edit touched. Once the total size exceeds
+    max_bytes the oldest entries are dropped; max_bytes=0 disables recording.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.undo_entries = deque()
+        self.redo_entries = []
+        self.current_bytes = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_entries)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_entries)
+
+    def record(self, entry):
+        for dropped in self.redo_entries:
+            self.current_bytes -= dropped.nbytes
+        self.redo_entries = []
+        self.undo_entries.append(entry)
+        self.current_bytes += entry.nbytes
+        while self.current_bytes > self.max_bytes and self.undo_entries:
+            self.current_bytes -= self.undo_entries.popleft().nbytes
+
+    def pop_undo(self):
+        if not self.undo_entries:
+            return None
+        entry = self.undo_entries.pop()
+        self.redo_entries.append(entry)
+        return entry
+
+    def pop_redo(self):
+        if not self.redo_entries:
+            return None
+        entry = self.redo_entries.pop()
+        self.undo_entries.append(entry)
+        return entry
+
+    def discard(self, entry):
+        # For an entry that could not be restored and cannot be replayed any more
+        for entries in (self.undo_entries, self.redo_entries):
+            if entry in entries:
+                entries.remove(entry)
+                self.current_bytes -= entry.nbytes
+
+    def clear(self):
+        self.undo_entries.clear()
+        self.redo_entries = []
+        self.current_bytes = 0
+
+
+class EditTransaction:
+    """Queues redactions and text insertions and applies them with one
+    apply_redactions() call per page.
+
+    If any operation fails while committing, every touched page is restored
+    from a snapshot taken beforehand and the error is re-raised. Snapshots the
+    caller already took can be passed in as {page index: PageSnapshot}.
+    """
+
+    def __init__(self, document, snapshots=None):
+        self.document = document
+        self.snapshots = snapshots or {}
+        self.redactions = {}
+        self.insertions = {}
+
+    def redact(self, page_index, rect, fill=(1, 1, 1)):
+        self.redactions.setdefault(page_index, []).append((fitz.Rect(rect), fill))
+
+    def insert_text(self, page_index, point, text, **options):
+        self.insertions.setdefault(page_index, []).append((point, text, options))
+
+    def pages(self):
+        return sorted(set(self.redactions) | set(self.insertions))
+
+    def commit(self):
+        pages = self.pages()
+        snapshots = [self.snapshots.get(page_index) or PageSnapshot(self.document, page_index) for page_index in pages]
+        try:
+            for page_index in pages:
+                self._commit_page(page_index)
+        except Exception as e:
+            # Pages held by the failed frames would keep the restored pages from reloading
+            traceback.clear_frames(e.__traceback__)
+            for snapshot in snapshots:
+                snapshot.restore(self.document)
+            raise
+        finally:
+            self.rollback()
+        return pages
+
+    def _commit_page(self, page_index):
+        page = self.document[page_index]
+        redactions = self.redactions.get(page_index)
+        if redactions:
+            for rect, fill in redactions:
+                page.add_redact_annot(rect, fill=fill)
+            with PROFILER.span("apply_redactions", page=page_index, rects=len(redactions)):
+                page.apply_redactions()
+        insertions = self.insertions.get(page_index)
+        if insertions:
+            # One shape per page, so many insertions add a single content stream
+            shape = page.new_shape()
+            for point, text, options in insertions:
+                shape.insert_text(point, text, **options)
+            shape.commit()
+
+    def rollback(self):
+        self.redactions = {}
+        self.insertions = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+class SpatialIndex:
+    """Uniform grid over PDF coordinates for point and rectangle hit-testing.
+
+    Items are kept in insertion order so callers can reproduce the priority of
+    the lists they were built from.
+    """
+
+    def __init__(self, cell_size=48):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.items = {}
+        self.sequence = 0
+
+    def _cells_for(self, x0, y0, x1, y1):
+        size = self.cell_size
+        for cx in range(int(x0 // size), int(x1 // size) + 1):
+            for cy in range(int(y0 // size), int(y1 // size) + 1):
+                yield (cx, cy)
+
+    def insert(self, kind, item, rect):
+        self.remove(item)
+        x0, y0, x1, y1 = rect
+        self.sequence += 1
+        self.items[id(item)] = (self.sequence, kind, item, (x0, y0, x1, y1))
+        for cell in self._cells_for(x0, y0, x1, y1):
+            self.cells.setdefault(cell, set()).add(id(item))
+
+    def remove(self, item):
+        entry = self.items.pop(id(item), None)
+        if entry is None:
+            return
+        for cell in self._cells_for(*entry[3]):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(id(item))
+                if not bucket:
+                    del self.cells[cell]
+
+    def query_point(self, x, y, kind=None):
+        size = self.cell_size
+        hits = []
+        for item_id in self.cells.get((int(x // size), int(y // size)), ()):
+            sequence, item_kind, item, (x0, y0, x1, y1) = self.items[item_id]
+            if (kind is None or item_kind == kind) and x0 <= x <= x1 and y0 <= y <= y1:
+                hits.append((sequence, item))
+        hits.sort(key=lambda h: h[0])
+        return [item for _, item in hits]
+
+    def query_rect(self, x0, y0, x1, y1, kind=None):
+        candidates = set()
+        for cell in self._cells_for(x0, y0, x1, y1):
+            candidates.update(self.cells.get(cell, ()))
+        hits = []
+        for item_id in candidates:
+            sequence, item_kind, item, (ix0, iy0, ix1, iy1) = self.items[item_id]
+            if (kind is None or item_kind == kind) and ix0 <= x1 and x0 <= ix1 and iy0 <= y1 and y0 <= iy1:
+                hits.append((sequence, item))
+        hits.sort(key=lambda h: h[0])
+        return [item for _, item in hits]
+
+    def clear(self):
+        self.cells.clear()
+        self.items.clear()
+
+
+SEARCH_TERM = re.compile(r"\w+")
+
+
+def search_terms(text):
+    return [term.casefold() for term in SEARCH_TERM.findall(text)]
+
+
+def page_word_entries(page):
+    # (term, x0, y0, x1, y1) in content stream order; punctuation is dropped and a word
+    # such as "e-mail" becomes one entry per term sharing the word's box
+    entries = []
+    for x0, y0, x1, y1, text, *_ in page.get_text("words"):
+        for term in search_terms(text):
+            entries.append((term, round(x0, 1), round(y0, 1), round(x1, 1), round(y1, 1)))
+    return entries
+
+
+class SearchIndex:
+    """Inverted index from words to the pages and word positions they occur at.
+
+    Pages are added and replaced one at a time, so an edit only re-indexes the
+    page it touched. Queries match whole words case-insensitively, several words
+    only when consecutive, and the last word also as a prefix.
+    """
+
+    def __init__(self):
+        self.pages = {}  # page index -> word entries from page_word_entries()
+        self.postings = {}  # term -> {page index: [word positions]}
+        self._vocabulary = None
+
+    def __contains__(self, page_index):
+        return page_index in self.pages
+
+    def __len__(self):
+        return len(self.pages)
+
+    def add_page(self, page_index, entries):
+        self.remove_page(page_index)
+        self.pages[page_index] = entries
+        positions = {}
+        for position, entry in enumerate(entries):
+            positions.setdefault(entry[0], []).append(position)
+        for term, term_positions in positions.items():
+            pages = self.postings.get(term)
+            if pages is None:
+                pages = self.postings[term] = {}
+                self._vocabulary = None
+            pages[page_index] = term_positions
+
+    def remove_page(self, page_index):
+        entries = self.pages.pop(page_index, None)
+        if entries is None:
+            return
+        for term in {entry[0] for entry in entries}:
+            pages = self.postings[term]
+            del pages[page_index]
+            if not pages:
+                del self.postings[term]
+                self._vocabulary = None
+
+    def _prefix_postings(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        merged = {}
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            for page_index, positions in self.postings[term].items():
+                merged.setdefault(page_index, []).extend(positions)
+        return merged
+
+    def search(self, query, limit=None):
+        """Return hits in page order as dicts with page, rect (union of the words) and rects."""
+        terms = search_terms(query)
+        if not terms:
+            return []
+        postings = [self.postings.get(term, {}) for term in terms[:-1]]
+        postings.append(self._prefix_postings(terms[-1]))
+        pages = set(postings[0])
+        for term_pages in postings[1:]:
+            pages &= term_pages.keys()
+
+        hits = []
+        for page_index in sorted(pages):
+            entries = self.pages[page_index]
+            following = [set(term_pages[page_index]) for term_pages in postings[1:]]
+            for start in sorted(postings[0][page_index]):
+                if not all(start + offset in positions for offset, positions in enumerate(following, 1)):
+                    continue
+                rects = [fitz.Rect(entries[p][1:]) for p in range(start, start + len(terms))]
+                rect = fitz.Rect(rects[0])
+                for word_rect in rects[1:]:
+                    rect |= word_rect
+                hits.append({"page": page_index, "rect": rect, "rects": rects})
+                if limit is not None and len(hits) >= limit:
+                    return hits
+        return hits
+
+    def clear(self):
+        self.pages.clear()
+        self.postings.clear()
+        self._vocabulary = None
+
+
+def resident_memory():
+    """Resident set size of this process in bytes, or None where it cannot be read.
+
+    Only Linux (/proc) and Windows report the current size; getrusage elsewhere
+    only gives the peak, which never goes down and so cannot drive trimming.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage",
+                )
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+        get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        if get_info(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    return None
+
+
+class MappedFile:
+    """Read-only memory map of a file, handed to MuPDF without copying.
+
+    The OS pages the file in as MuPDF reads it, so opening does not depend on
+    the file size, and touched pages can be given back with release().
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        self.view = memoryview(self.mapping)
+
+    def release(self):
+        # Resident pages of a clean file mapping are dropped and re-read on demand
+        if hasattr(self.mapping, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+            self.mapping.madvise(mmap.MADV_DONTNEED)
+
+    def close(self):
+        self.view.release()
+        self.mapping.close()
+        self.file.close()
+
+
+class _ThreadDocument:
+    # One worker thread's open file; the lock is held while the thread uses it
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.key = None
+        self.document = None
+        self.mapped_file = None
+
+    def close(self):
+        if self.document is not None:
+            self.document.close()
+            if self.mapped_file is not None:
+                self.mapped_file.close()
+        self.key = self.document = self.mapped_file = None
+
+
+_thread_state = threading.local()
+_thread_documents = []  # every thread's _ThreadDocument
+_thread_documents_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def thread_document(filepath, generation=0, memory_map=False):
+    """The calling thread's own copy of a file, for workers reading it next to the editor.
+
+    It is opened on first use and kept until another file or generation is asked
+    for; memory_map=True reads it through a MappedFile, as PDFEngine.open does.
+    Use the document only inside the with block.
+    """
+    state = getattr(_thread_state, "document", None)
+    if state is None:
+        state = _thread_state.document = _ThreadDocument()
+        with _thread_documents_lock:
+            _thread_documents.append(state)
+    key = (filepath, generation)
+    with state.lock:
+        if state.key != key:
+            state.close()
+            mapped_file = MappedFile(filepath) if memory_map else None
+            try:
+                state.document = fitz.open("pdf", mapped_file.view) if mapped_file else fitz.open(filepath)
+            except Exception:
+                if mapped_file:
+                    mapped_file.close()
+                raise
+            state.mapped_file, state.key = mapped_file, key
+        yield state.document
+
+
+@contextlib.contextmanager
+def thread_documents_closed():
+    """Close every thread's document and keep them closed until the block ends.
+
+    Waits for threads that are using theirs. Files cannot be replaced on Windows
+    while they are open, so this wraps replacing one.
+    """
+    with _thread_documents_lock:
+        held = []
+        try:
+            for state in _thread_documents:
+                state.lock.acquire()
+                held.append(state)
+                state.close()
+            yield
+        finally:
+            for state in held:
+                state.lock.release()
+
+
+def locked(method):
+    # PDFEngine methods that use the document hold its lock
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class PDFEngine:
+    """An open document plus the per-page state the editor derives from it.
+
+    Every change goes through apply(), which bumps the revision of each page it
+    touches so cached sentences (and any caches kept by callers) can be
+    invalidated per page. Code using the document from another thread, or
+    pages from page() outside the engine's methods, holds lock while it does.
+    """
+
+    def __init__(self, document, filepath=None, history_limit=64 * 1024 * 1024, page_cache_size=8, mapped_file=None):
+        self.document = document
+        self.filepath = filepath
+        self.mapped_file = mapped_file
+        self.lock = threading.RLock()
+        # Loaded pages, least recently used first; anything else should not hold on to fitz.Page objects
+        self.page_objects = OrderedDict()
+        self.page_cache_size = page_cache_size
+        self.history = EditHistory(history_limit)
+        self.page_revisions = {}
+        self.sentence_cache = {}  # page index -> (page revision, sentences)
+        self.field_index = FormFieldIndex(document)
+        self.search_index = SearchIndex()
+        self.indexed_revisions = {}  # page index -> page revision the search index reflects
+        self.edit_generation = 0
+        self.saved_generation = 0
+        self._page_sizes = None
+
+    @classmethod
+    def open(cls, filepath, memory_map=False, **options):
+        """Open a file; memory_map=True reads it through a memory map instead of file I/O."""
+        mapped_file = MappedFile(filepath) if memory_map else None
+        try:
+            document = fitz.open("pdf", mapped_file.view) if mapped_file else fitz.open(filepath)
+        except Exception:
+            if mapped_file:
+                mapped_file.close()
+            raise
+        if document.is_encrypted:
+            document.close()
+            if mapped_file:
+                mapped_file.close()
+            raise EngineError("The PDF is encrypted or has editing restrictions.")
+        return cls(document, filepath, mapped_file=mapped_file, **options)
+
+    @locked
+    def close(self):
+        self.release_pages()
+        self.document.close()
+        if self.mapped_file is not None:
+            self.mapped_file.close()
+
+    @locked
+    def page(self, page_index):
+        page = self.page_objects.pop(page_index, None)
+        if page is None:
+            page = self.document[page_index]
+        self.page_objects[page_index] = page
+        while len(self.page_objects) > self.page_cache_size:
+            self.page_objects.popitem(last=False)
+        return page
+
+    def release_pages(self):
+        # Edits and snapshot restores reload pages, which needs the old objects gone
+        self.page_objects.clear()
+
+    @locked
+    def trim_memory(self):
+        """Drop loaded pages, MuPDF's resource store and resident file pages."""
+        self.release_pages()
+        gc.collect()
+        fitz.TOOLS.store_shrink(100)
+        if self.mapped_file is not None:
+            self.mapped_file.release()
+
+    def __len__(self):
+        return len(self.document)
+
+    @property
+    def has_unsaved_changes(self):
+        return self.edit_generation != self.saved_generation
+
+    def page_revision(self, page_index):
+        return self.page_revisions.get(page_index, 0)
+
+    def mark_page_modified(self, page_index):
+        self.edit_generation += 1
+        self.page_revisions[page_index] = self.page_revision(page_index) + 1
+        self.sentence_cache.pop(page_index, None)
+
+    @locked
+    def sentences(self, page_index):
+        # Sentences only change when the page content does
+        revision = self.page_revision(page_index)
+        cached = self.sentence_cache.get(page_index)
+        if cached is not None and cached[0] == revision:
+            PROFILER.count("sentence_cache.hit")
+            return cached[1]
+        PROFILER.count("sentence_cache.miss")
+        with PROFILER.span("extract_sentences", page=page_index):
+            sentences = extract_sentences(self.page(page_index))
+        self.sentence_cache[page_index] = (revision, sentences)
+        return sentences
+
+    @locked
+    def form_fields(self, page_index):
+        with PROFILER.span("extract_form_fields", page=page_index):
+            return extract_form_fields(self.page(page_index))
+
+    def add_search_entries(self, page_index, entries):
+        # Entries extracted elsewhere (a worker or a cache on disk) describe the unedited page
+        if self.page_revision(page_index):
+            self.update_search_index([page_index])
+        else:
+            self.search_index.add_page(page_index, entries)
+            self.indexed_revisions[page_index] = 0
+
+    @locked
+    def update_search_index(self, pages=None):
+        """Re-index the given pages (default: all) whose content changed since they were indexed."""
+        updated = 0
+        for page_index in range(len(self.document)) if pages is None else list(pages):
+            revision = self.page_revision(page_index)
+            if self.indexed_revisions.get(page_index) != revision:
+                self.search_index.add_page(page_index, page_word_entries(self.page(page_index)))
+                self.indexed_revisions[page_index] = revision
+                updated += 1
+        return updated
+
+    @locked
+    def find_text(self, query, pages=None):
+        """Matches of query on the given pages (default: all), in page order."""
+        matches = []
+        for page_index in range(len(self.document)) if pages is None else pages:
+            matches.extend(find_text(self.page(page_index), query))
+        return matches
+
+    @locked
+    def replace_all(self, query, replacement, pages=None, matches=None):
+        """Replace every match of query; returns ({page index: replacements}, failed matches).
+
+        Matches can be passed in when they were found elsewhere, for example by
+        worker processes reading the file on disk. Each page gets a single
+        redaction pass and the whole replacement is one undo step. A match that
+        cannot be replaced is returned as failed and the others still are.
+        """
+        if matches is None:
+            matches = self.find_text(query, pages)
+        counts, failed = {}, []
+        if not matches:
+            return counts, failed
+        self.release_pages()
+        pages = {match["page"] for match in matches if 0 <= match["page"] < len(self.document)}
+        before = self._snapshot_before(dict.fromkeys(pages, False))
+        self._replace_matches(matches, replacement, counts, failed)
+        for page_index in counts:
+            self.mark_page_modified(page_index)
+        self._record("Replace all", before, set(counts))
+        return counts, failed
+
+    def _replace_matches(self, matches, replacement, counts, failed):
+        transaction = EditTransaction(self.document)
+        try:
+            for match in matches:
+                self._queue_text_operation(transaction, ReplaceText(
+                    match["page"], tuple(match["rect"]), replacement, font_size=match["font_size"],
+                    font_family=match["font_family"], color=tuple(match["color"]), baseline=match["baseline"],
+                ))
+            transaction.commit()
+        except Exception as e:
+            # The transaction rolled its pages back; retry page by page, then match by match
+            transaction.rollback()
+            if len(matches) == 1:
+                PROFILER.error(f"Replacing a match on page {matches[0]['page'] + 1} failed: {e}")
+                failed.append(matches[0])
+                return
+            pages = sorted({match["page"] for match in matches})
+            if len(pages) > 1:
+                groups = [[match for match in matches if match["page"] == page_index] for page_index in pages]
+            else:
+                groups = [[match] for match in matches]
+            for group in groups:
+                self._replace_matches(group, replacement, counts, failed)
+            return
+        for match in matches:
+            counts[match["page"]] = counts.get(match["page"], 0) + 1
+
+    @locked
+    def search(self, query, limit=None, build=True):
+        """Find query in the document; with build=False only pages already indexed are searched."""
+        self.update_search_index(None if build else self.indexed_revisions)
+        return self.search_index.search(query, limit)
+
+    @locked
+    def page_sizes(self):
+        # (width, height) of every mediabox; edits never change page geometry
+        if self._page_sizes is None:
+            self._page_sizes = [(page.mediabox.width, page.mediabox.height) for page in self.document]
+        return self._page_sizes
+
+    @locked
+    def list_fields(self):
+        return self.field_index.list_fields()
+
+    @locked
+    def fill_fields(self, values):
+        self.release_pages()
+        before = None
+        if self.history.enabled:
+            pages = {entry["page"] for entry in self.field_index.list_fields() if entry["field_name"] in values}
+            before = self._snapshot_before(dict.fromkeys(pages, True))
+        touched = self.field_index.fill(values)
+        for page_index in touched:
+            self.mark_page_modified(page_index)
+        self._record("Fill fields", before, touched)
+        return touched
+
+    @locked
+    def render_pixmap(self, page_index, scale_factor, clip=None):
+        mat = fitz.Matrix(scale_factor, scale_factor)
+        with PROFILER.span("get_pixmap", page=page_index, scale=scale_factor):
+            return self.page(page_index).get_pixmap(matrix=mat, clip=clip)
+
+    @locked
+    @PROFILER.timed("apply")
+    def apply(self, *operations):
+        """Apply edit operations and return the indices of the pages they changed.
+
+        Text operations are batched into one EditTransaction, so each page gets
+        a single redaction pass. If any operation fails, every page the call
+        touches is restored and the error is re-raised, so nothing is left
+        half applied outside the undo history.
+        """
+        self.release_pages()
+        before = {
+            page_index: PageSnapshot(self.document, page_index, forms)
+            for page_index, forms in self._pages_for(operations).items()
+        }
+        transaction = EditTransaction(self.document, before)
+        strokes = {}
+        others = []
+        touched = set()
+        try:
+            for operation in operations:
+                if isinstance(operation, TEXT_OPERATIONS):
+                    self._queue_text_operation(transaction, operation)
+                elif isinstance(operation, AddInk):
+                    strokes.setdefault(operation.page, []).append(
+                        (operation.points, operation.color, operation.width, operation.smooth)
+                    )
+                else:
+                    others.append(operation)
+            touched.update(transaction.commit())
+            for page_index, page_strokes in strokes.items():
+                # One content stream per page for all of its strokes
+                if flatten_strokes(self.document[page_index], page_strokes):
+                    touched.add(page_index)
+            for operation in others:
+                page_index = self._apply_operation(operation)
+                if page_index is not None:
+                    touched.add(page_index)
+        except Exception as e:
+            transaction.rollback()
+            self.release_pages()
+            traceback.clear_frames(e.__traceback__)
+            for snapshot in before.values():
+                snapshot.restore(self.document)
+            if any(snapshot.annotations for snapshot in before.values()):
+                self.field_index.invalidate()
+            raise
+        for page_index in touched:
+            self.mark_page_modified(page_index)
+        label = type(operations[0]).__name__ if len(operations) == 1 else f"{len(operations)} edits"
+        self._record(label, before if self.history.enabled else None, touched)
+        return touched
+
+    def _pages_for(self, operations):
+        # page index -> whether the edit touches annotations (form fields) on that page
+        pages = {}
+        for operation in operations:
+            page_index = operation.page
+            if page_index is None:
+                entry = self.field_index.get(operation.field_name)
+                if entry is None:
+                    continue
+                page_index = entry["page"]
+            forms = not isinstance(operation, TEXT_OPERATIONS + (AddInk,))
+            pages[page_index] = pages.get(page_index, False) or forms
+        return pages
+
+    def _snapshot_before(self, pages):
+        if not self.history.enabled:
+            return None
+        return {page_index: PageSnapshot(self.document, page_index, forms) for page_index, forms in pages.items()}
+
+    def _record(self, label, before, touched):
+        if before is None or not touched:
+            return
+        pages = sorted(p for p in touched if p in before)
+        self.history.record(HistoryEntry(
+            label,
+            [before[p] for p in pages],
+            [PageSnapshot(self.document, p, before[p].annotations) for p in pages],
+        ))
+
+    @locked
+    def undo(self):
+        """Revert the latest recorded edit; returns the pages it restored, or None."""
+        entry = self.history.pop_undo()
+        return None if entry is None else self._restore(entry, entry.before)
+
+    @locked
+    def redo(self):
+        entry = self.history.pop_redo()
+        return None if entry is None else self._restore(entry, entry.after)
+
+    def _restore(self, entry, snapshots):
+        self.release_pages()
+        try:
+            for snapshot in snapshots:
+                snapshot.restore(self.document)
+        except Exception as e:
+            # Some pages may be restored and others not, so the entry cannot be replayed
+            self.history.discard(entry)
+            raise EngineError(f"Could not restore page {snapshot.page_index + 1} for '{entry.label}': {e}") from e
+        finally:
+            for snapshot in snapshots:
+                self.mark_page_modified(snapshot.page_index)
+            if any(snapshot.annotations for snapshot in snapshots):
+                self.field_index.invalidate()
+        return {snapshot.page_index for snapshot in snapshots}
+
+    def _queue_text_operation(self, transaction, operation):
+        if isinstance(operation, DeleteText):
+            transaction.redact(operation.page, operation.rect)
+            return
+        options = {
+            "fontsize": operation.font_size,
+            "fontname": fitz_font_name(operation.font_family),
+            "color": normalize_color(operation.color),
+        }
+        if isinstance(operation, ReplaceText):
+            rect = fitz.Rect(operation.rect)
+            transaction.redact(operation.page, rect)
+            baseline = operation.baseline
+            if baseline is None:
+                baseline = rect.y0 + (rect.height / 2) + operation.font_size / 2
+            point = (rect.x0, baseline)
+        elif isinstance(operation, MoveText):
+            transaction.redact(operation.page, operation.rect)
+            new_rect = fitz.Rect(operation.new_rect)
+            point = (new_rect.x0, new_rect.y0 + operation.font_size)
+        else:
+            point = operation.point
+        transaction.insert_text(operation.page, point, operation.text, **options)
+
+    def _load_widget(self, field_name, page_index):
+        page, widget = self.field_index.load_widget(field_name, page_index)
+        if widget is None:
+            raise EngineError(f"Form field '{field_name}' not found.")
+        return page, widget
+
+    def _apply_operation(self, operation):
+        if isinstance(operation, FillField):
+            page, widget = self._load_widget(operation.field_name, operation.page)
+            set_widget_value(widget, operation.value)
+            self.field_index.refresh(page.number, widget)
+            return page.number
+        if isinstance(operation, MoveField):
+            page, widget = self._load_widget(operation.field_name, operation.page)
+            widget.rect = fitz.Rect(operation.new_rect)
+            widget.update()
+            self.field_index.refresh(page.number, widget)
+            return page.number
+        if isinstance(operation, DeleteField):
+            page, widget = self._load_widget(operation.field_name, operation.page)
+            xref = widget.xref
+            page.delete_widget(widget)
+            self.field_index.remove(operation.field_name, xref)
+            return page.number
+        raise EngineError(f"Unknown edit operation: {operation!r}")
+
+    @locked
+    @PROFILER.timed("save")
+    def save(self, save_path):
+        same_file = self.filepath and os.path.exists(save_path) and os.path.samefile(save_path, self.filepath)
+        # A document read from a memory map has no original file to append to
+        if same_file and self.mapped_file is None and self.document.can_save_incrementally():
+            # Only the changed objects are appended, so the cost follows the size of the edits
+            self.document.save(save_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+        elif same_file:
+            # MuPDF cannot rewrite the file it reads from in place
+            temp_path = save_path + ".tmp"
+            self.document.save(temp_path)
+            self._replace_file(temp_path, save_path)
+        else:
+            self.document.save(save_path)
+        self.saved_generation = self.edit_generation
+
+    def _replace_file(self, temp_path, path):
+        # The open document (and map) must let go of the file before it can be replaced, and
+        # is then reopened from the new file. A plain save keeps xref numbers, so the field
+        # index and undo snapshots stay valid.
+        self.release_pages()
+        self.document.close()
+        memory_map = self.mapped_file is not None
+        if memory_map:
+            self.mapped_file.close()
+            self.mapped_file = None
+        # Worker threads reading the file through thread_document let go of it too
+        with thread_documents_closed():
+            os.replace(temp_path, path)
+        if memory_map:
+            self.mapped_file = MappedFile(path)
+            self.document = fitz.open("pdf", self.mapped_file.view)
+        else:
+            self.document = fitz.open(path)
+        if self.field_index.fields is None:
+            self.field_index = FormFieldIndex(self.document)
+        else:
+            self.field_index = self.field_index.copy_for(self.document)
+
+    @locked
+    @PROFILER.timed("snapshot")
+    def write_snapshot(self, path):
+        # Written straight to the file, so no copy of the whole document is built in memory
+        self.document.save(path)
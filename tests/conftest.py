@@ -0,0 +1,39 @@
+import os
+import sys
+
+import fitz
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mixed_font_pdf(tmp_path):
+    """One page with the same phrase in Helvetica, Times and Courier."""
+    document = fitz.open()
+    page = document.new_page()
+    for y, font in ((100, "helv"), (140, "tiro"), (180, "cour")):
+        page.insert_text((72, y), "Invoice from Acme Ltd today.", fontname=font, fontsize=11)
+    path = tmp_path / "mixed.pdf"
+    document.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def form_pdf(tmp_path):
+    """One page with a text field and a checkbox."""
+    document = fitz.open()
+    page = document.new_page()
+    for name, field_type, rect in (
+        ("name", fitz.PDF_WIDGET_TYPE_TEXT, fitz.Rect(72, 72, 272, 92)),
+        ("agree", fitz.PDF_WIDGET_TYPE_CHECKBOX, fitz.Rect(72, 120, 86, 134)),
+    ):
+        widget = fitz.Widget()
+        widget.field_name = name
+        widget.field_type = field_type
+        widget.rect = rect
+        page.add_widget(widget)
+    page.insert_text((72, 200), "Signed in London.", fontsize=11)
+    path = tmp_path / "form.pdf"
+    document.save(path)
+    return str(path)
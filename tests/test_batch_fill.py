@@ -0,0 +1,34 @@
+import csv
+import os
+
+import fitz
+import pytest
+
+import batch_fill
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "template.pdf")
+
+
+def field_value(path, name):
+    with fitz.open(path) as document:
+        return next(w.field_value for page in document for w in page.widgets() if w.field_name == name)
+
+
+def test_name_field_is_filled_and_names_are_unique(tmp_path):
+    records = tmp_path / "records.csv"
+    with open(records, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ag_massnahme_nr", "ag_vergabe_nr"])
+        writer.writerows([["42", "First"], ["43", "Second"], ["42", "Third"], ["", "Fourth"]])
+    output_dir = tmp_path / "filled"
+    done, failed = batch_fill.run(TEMPLATE, str(records), str(output_dir), workers=1, name_field="ag_massnahme_nr")
+    assert (done, failed) == (4, 0)
+    assert sorted(os.listdir(output_dir)) == ["42-2.pdf", "42.pdf", "43.pdf", "record_000004.pdf"]
+    assert field_value(output_dir / "42.pdf", "ag_massnahme_nr") == "42"
+    assert field_value(output_dir / "43.pdf", "ag_massnahme_nr") == "43"
+    assert field_value(output_dir / "42-2.pdf", "ag_vergabe_nr") == "Third"
+
+
+def test_report_every_must_be_positive(tmp_path):
+    with pytest.raises(SystemExit):
+        batch_fill.main([TEMPLATE, str(tmp_path / "records.csv"), "--report-every", "0"])
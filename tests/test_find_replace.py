@@ -0,0 +1,42 @@
+import fitz
+
+import find_replace
+from pdf_engine import FONT_MAPPING, PDFEngine
+
+
+def test_font_mapping_uses_base14_names():
+    page = fitz.open().new_page()
+    for fontname in set(FONT_MAPPING.values()):
+        page.insert_text((72, 72), "x", fontname=fontname)
+
+
+def test_replace_all_handles_mixed_fonts(mixed_font_pdf):
+    engine = PDFEngine.open(mixed_font_pdf)
+    counts, failed = engine.replace_all("Acme Ltd", "Acme GmbH")
+    assert counts == {0: 3}
+    assert failed == []
+    text = engine.page(0).get_text()
+    assert text.count("Acme GmbH") == 3
+    assert "Acme Ltd" not in text
+
+
+def test_replace_all_keeps_going_after_a_failed_match(mixed_font_pdf):
+    engine = PDFEngine.open(mixed_font_pdf)
+    matches = engine.find_text("Acme Ltd")
+    bad = dict(matches[0], page=5)
+    counts, failed = engine.replace_all("Acme Ltd", "Acme GmbH", matches=matches + [bad])
+    assert counts == {0: 3}
+    assert failed == [bad]
+
+
+def test_replace_all_is_one_undo_step(mixed_font_pdf):
+    engine = PDFEngine.open(mixed_font_pdf)
+    engine.replace_all("Acme Ltd", "Acme GmbH")
+    assert engine.undo() == {0}
+    assert engine.page(0).get_text().count("Acme Ltd") == 3
+
+
+def test_find_replace_cli(mixed_font_pdf, tmp_path):
+    output = tmp_path / "out.pdf"
+    assert find_replace.main([mixed_font_pdf, str(output), "--find", "Acme Ltd", "--replace", "Acme GmbH", "--workers", "1"]) == 0
+    assert fitz.open(output)[0].get_text().count("Acme GmbH") == 3
@@ -0,0 +1,144 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import pytest
+
+from pdf_engine import AddInk, DeleteField, EngineError, FillField, MoveField, PDFEngine, ReplaceText, thread_document
+
+TEMPLATE_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "template.pdf")
+
+
+def field_value(path, name):
+    with fitz.open(path) as document:
+        return next(w.field_value for page in document for w in page.widgets() if w.field_name == name)
+
+
+def page_state(engine, page_index=0):
+    page = engine.page(page_index)
+    return page.get_text(), len(page.get_drawings()), {w.field_name: w.field_value for w in page.widgets()}
+
+
+def test_undo_redo_round_trip(form_pdf):
+    engine = PDFEngine.open(form_pdf)
+    sentence = engine.sentences(0)[0]
+    states = [page_state(engine)]
+    for operation in (
+        ReplaceText(0, tuple(sentence["rect"]), "Signed in Paris.", font_size=11),
+        FillField("name", "Jane Doe"),
+        FillField("agree", True),
+        AddInk(0, [(100, 300), (150, 320), (200, 300), (250, 330)], smooth=True),
+    ):
+        engine.apply(operation)
+        states.append(page_state(engine))
+    assert states[1][0] != states[0][0]
+    assert states[2][2]["name"] == "Jane Doe"
+    assert states[4][1] > states[3][1]
+
+    for expected in reversed(states[:-1]):
+        assert engine.undo() == {0}
+        assert page_state(engine) == expected
+    assert engine.undo() is None
+    for expected in states[1:]:
+        assert engine.redo() == {0}
+        assert page_state(engine) == expected
+    assert engine.redo() is None
+
+
+def test_strokes_share_one_content_stream(form_pdf):
+    engine = PDFEngine.open(form_pdf)
+    streams = len(engine.page(0).get_contents())
+    engine.apply(*[
+        AddInk(0, [(100, 300 + i * 10), (150, 320 + i * 10), (200, 300 + i * 10)], smooth=i % 2 == 0)
+        for i in range(10)
+    ])
+    page = engine.page(0)
+    assert len(page.get_contents()) == streams + 1
+    assert len(page.get_drawings()) == 10
+
+
+def test_failed_apply_rolls_back_every_operation(form_pdf):
+    engine = PDFEngine.open(form_pdf)
+    sentence = engine.sentences(0)[0]
+    before = page_state(engine)
+    with pytest.raises(Exception):
+        engine.apply(
+            ReplaceText(0, tuple(sentence["rect"]), "Signed in Paris.", font_size=11),
+            FillField("name", "Jane Doe"),
+            MoveField("agree", "not a rect"),
+        )
+    assert page_state(engine) == before
+    assert {field["field_name"]: field["value"] for field in engine.list_fields()}["name"] in ("", None)
+    assert not engine.history.can_undo
+    assert not engine.has_unsaved_changes
+
+
+def test_undo_field_deletion_on_template(tmp_path):
+    path = str(tmp_path / "template.pdf")
+    shutil.copyfile(TEMPLATE_PDF, path)
+    engine = PDFEngine.open(path)
+    before = page_state(engine)
+    engine.apply(DeleteField("ag_vergabe_nr"))
+    assert "ag_vergabe_nr" not in page_state(engine)[2]
+    assert engine.undo() == {0}
+    assert page_state(engine) == before
+    assert engine.redo() == {0}
+    assert "ag_vergabe_nr" not in page_state(engine)[2]
+
+
+def test_failed_restore_drops_the_history_entry(form_pdf):
+    engine = PDFEngine.open(form_pdf)
+    engine.apply(FillField("name", "Jane Doe"))
+    # A page still referenced elsewhere cannot be reloaded
+    page = engine.document[0]
+    widgets = list(page.widgets())
+    with pytest.raises(EngineError):
+        engine.undo()
+    assert widgets
+    assert not engine.history.can_undo
+    assert not engine.history.can_redo
+
+
+def test_memory_mapped_save_to_same_file(form_pdf):
+    engine = PDFEngine.open(form_pdf, memory_map=True)
+    engine.apply(FillField("name", "Jane Doe"))
+    engine.save(form_pdf)
+    assert not engine.has_unsaved_changes
+    assert field_value(form_pdf, "name") == "Jane Doe"
+
+    # The reopened document keeps working, including undo across the save
+    engine.apply(FillField("name", "John Doe"))
+    engine.save(form_pdf)
+    assert field_value(form_pdf, "name") == "John Doe"
+    assert engine.undo() == {0}
+    engine.save(form_pdf)
+    engine.close()
+    assert field_value(form_pdf, "name") == "Jane Doe"
+
+
+def test_thread_document_reopens_for_a_new_generation(form_pdf):
+    with thread_document(form_pdf, 1, memory_map=True) as document:
+        pass
+    with thread_document(form_pdf, 1, memory_map=True) as same:
+        assert same is document
+    with thread_document(form_pdf, 2) as reopened:
+        assert document.is_closed
+        assert reopened.page_count == 1
+
+
+def test_saving_memory_mapped_file_closes_worker_documents(form_pdf):
+    def open_on_worker():
+        with thread_document(form_pdf, 1, memory_map=True) as document:
+            return document
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        document = executor.submit(open_on_worker).result()
+        engine = PDFEngine.open(form_pdf, memory_map=True)
+        engine.apply(FillField("name", "Jane Doe"))
+        engine.save(form_pdf)
+        assert document.is_closed
+        # The worker opens the saved file on its next job
+        assert executor.submit(open_on_worker).result().page_count == 1
+        engine.close()
+    assert field_value(form_pdf, "name") == "Jane Doe"